@@ -0,0 +1,34 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '3b1f6c2d9e41'
+down_revision = '934dca824ff7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Триграммы нужны для ILIKE '%...%' и similarity() в поиске
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # Выражение должно совпадать с app.services.search_service.search_vector()
+    op.execute(
+        "CREATE INDEX ix_tracks_search_vector ON tracks USING gin ("
+        "(setweight(to_tsvector('simple', title), 'A') || "
+        "setweight(to_tsvector('simple', artist), 'B')))"
+    )
+    op.create_index(
+        'ix_tracks_title_trgm', 'tracks', ['title'], unique=False,
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_tracks_artist_trgm', 'tracks', ['artist'], unique=False,
+        postgresql_using='gin', postgresql_ops={'artist': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_tracks_artist_trgm', table_name='tracks')
+    op.drop_index('ix_tracks_title_trgm', table_name='tracks')
+    op.drop_index('ix_tracks_search_vector', table_name='tracks')
@@ -0,0 +1,28 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5c8e2a7f1d03'
+down_revision = '3b1f6c2d9e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tracks', sa.Column('favorites_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('tracks', sa.Column('dislikes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('tracks', sa.Column('reviews_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Заполняем счетчики из существующих данных
+    op.execute(
+        "UPDATE tracks SET "
+        "favorites_count = (SELECT count(*) FROM favorites WHERE favorites.track_id = tracks.id), "
+        "dislikes_count = (SELECT count(*) FROM dislikes WHERE dislikes.track_id = tracks.id), "
+        "reviews_count = (SELECT count(*) FROM reviews WHERE reviews.track_id = tracks.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('tracks', 'reviews_count')
+    op.drop_column('tracks', 'dislikes_count')
+    op.drop_column('tracks', 'favorites_count')
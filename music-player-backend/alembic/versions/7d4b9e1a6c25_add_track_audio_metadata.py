@@ -0,0 +1,24 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '7d4b9e1a6c25'
+down_revision = '5c8e2a7f1d03'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tracks', sa.Column('codec', sa.String(), nullable=True))
+    op.add_column('tracks', sa.Column('bitrate', sa.Integer(), nullable=True))
+    op.add_column('tracks', sa.Column('sample_rate', sa.Integer(), nullable=True))
+    op.add_column('tracks', sa.Column('channels', sa.Integer(), nullable=True))
+    op.add_column('tracks', sa.Column('file_size', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tracks', 'file_size')
+    op.drop_column('tracks', 'channels')
+    op.drop_column('tracks', 'sample_rate')
+    op.drop_column('tracks', 'bitrate')
+    op.drop_column('tracks', 'codec')
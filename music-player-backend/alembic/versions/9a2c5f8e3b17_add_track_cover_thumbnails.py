@@ -0,0 +1,16 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '9a2c5f8e3b17'
+down_revision = '7d4b9e1a6c25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tracks', sa.Column('cover_thumbnails', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('tracks', 'cover_thumbnails')
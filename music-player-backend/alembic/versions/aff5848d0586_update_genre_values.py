@@ -24,6 +24,10 @@ def upgrade():
 
     # Выполняем SQL для обновления каждого значения
     conn = op.get_bind()
+    # На пустой базе таблицы ещё нет (её создаёт следующая миграция),
+    # исправлять нечего
+    if not sa.inspect(conn).has_table("tracks"):
+        return
     for old_value, new_value in mappings:
         conn.execute(
             text(f"UPDATE tracks SET genre = :new_value WHERE LOWER(genre) = :old_value"),
@@ -0,0 +1,39 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b4e7d2a9c813'
+down_revision = '9a2c5f8e3b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_blobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_media_blobs_id'), 'media_blobs', ['id'], unique=False)
+    op.create_index(op.f('ix_media_blobs_path'), 'media_blobs', ['path'], unique=True)
+
+    # Existing uuid-named files become blobs referenced by their tracks
+    op.execute("""
+        INSERT INTO media_blobs (path, ref_count)
+        SELECT path, count(*) FROM (
+            SELECT substr(cover_path, 8) AS path FROM tracks WHERE cover_path LIKE '/media/%'
+            UNION ALL
+            SELECT substr(audio_path, 8) AS path FROM tracks WHERE audio_path LIKE '/media/%'
+        ) AS refs
+        GROUP BY path
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_media_blobs_path'), table_name='media_blobs')
+    op.drop_index(op.f('ix_media_blobs_id'), table_name='media_blobs')
+    op.drop_table('media_blobs')
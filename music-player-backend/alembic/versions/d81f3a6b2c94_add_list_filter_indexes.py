@@ -0,0 +1,58 @@
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd81f3a6b2c94'
+down_revision = 'b4e7d2a9c813'
+branch_labels = None
+depends_on = None
+
+
+# Списки фильтруют по владельцу/треку и листают по id (keyset), поэтому
+# id идёт вторым столбцом. favorites/dislikes (user_id, track_id) уже
+# покрыты уникальными ограничениями, но те не помогают сортировке по id.
+INDEXES = [
+    ('ix_favorites_user_id_id', 'favorites', ['user_id', 'id'], {}),
+    ('ix_dislikes_user_id_id', 'dislikes', ['user_id', 'id'], {}),
+    ('ix_reviews_track_id_id', 'reviews', ['track_id', 'id'], {}),
+    ('ix_playlist_tracks_playlist_id_position', 'playlist_tracks', ['playlist_id', 'position'], {}),
+    ('ix_playlists_user_id_is_public', 'playlists', ['user_id', 'is_public'], {}),
+    # Вторая ветка "user_id = :id OR is_public" в GET /playlists
+    ('ix_playlists_public_id', 'playlists', ['id'], {
+        'postgresql_where': sa.text('is_public'),
+        'sqlite_where': sa.text('is_public'),
+    }),
+    ('ix_tracks_genre_id', 'tracks', ['genre', 'id'], {}),
+]
+
+
+def is_invalid_index(name: str) -> bool:
+    return op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid) AND NOT i.indisvalid"
+    ), {"name": name}).first() is not None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY не блокирует запись, но не работает внутри
+    # транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            # Прерванный CREATE INDEX CONCURRENTLY оставляет INVALID индекс,
+            # планировщик его не использует, а IF NOT EXISTS пропустил бы его.
+            # Такой индекс удаляем и строим заново
+            if is_invalid_index(name):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_concurrently=True, **options
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table, if_exists=True,
+                postgresql_concurrently=True
+            )
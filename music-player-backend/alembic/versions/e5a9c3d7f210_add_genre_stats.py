@@ -0,0 +1,37 @@
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'e5a9c3d7f210'
+down_revision = 'd81f3a6b2c94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Тип genre уже создан таблицей tracks
+    genre = sa.Enum('POP', 'HIPHOP', 'AMBIENT', 'INDIE', 'LOFI', name='genre').with_variant(
+        postgresql.ENUM(name='genre', create_type=False), 'postgresql'
+    )
+    op.create_table(
+        'genre_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('genre', genre, nullable=False),
+        sa.Column('tracks_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('genre')
+    )
+    op.create_index(op.f('ix_genre_stats_id'), 'genre_stats', ['id'], unique=False)
+
+    op.execute("""
+        INSERT INTO genre_stats (genre, tracks_count)
+        SELECT genre, count(*) FROM tracks GROUP BY genre
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_genre_stats_id'), table_name='genre_stats')
+    op.drop_table('genre_stats')
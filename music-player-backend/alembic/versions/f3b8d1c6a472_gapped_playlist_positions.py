@@ -0,0 +1,31 @@
+from alembic import op
+
+
+revision = 'f3b8d1c6a472'
+down_revision = 'e5a9c3d7f210'
+branch_labels = None
+depends_on = None
+
+POSITION_GAP = 1024
+
+
+def renumber(step: int) -> None:
+    # Позиции по порядку внутри плейлиста: step, 2 * step, ...
+    op.execute(f"""
+        UPDATE playlist_tracks SET position = ranked.rn * {step}
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY playlist_id ORDER BY position, id
+            ) AS rn
+            FROM playlist_tracks
+        ) AS ranked
+        WHERE playlist_tracks.id = ranked.id
+    """)
+
+
+def upgrade() -> None:
+    renumber(POSITION_GAP)
+
+
+def downgrade() -> None:
+    renumber(1)
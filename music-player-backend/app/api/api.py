@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.endpoints import auth, users, tracks, playlists, favorites, dislikes, reviews, genres
+from app.api.endpoints import auth, users, tracks, playlists, favorites, dislikes, reviews, genres, metrics
 
 api_router = APIRouter()
 
@@ -11,4 +11,5 @@ api_router.include_router(playlists.router, prefix="/playlists", tags=["playlist
 api_router.include_router(favorites.router, prefix="/favorites", tags=["favorites"])
 api_router.include_router(dislikes.router, prefix="/dislikes", tags=["dislikes"])
 api_router.include_router(reviews.router, prefix="/reviews", tags=["reviews"])
-api_router.include_router(genres.router, prefix="/genres", tags=["genres"])
\ No newline at end of file
+api_router.include_router(genres.router, prefix="/genres", tags=["genres"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
\ No newline at end of file
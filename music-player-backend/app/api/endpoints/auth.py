@@ -3,65 +3,161 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from jose import JWTError, jwt
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.core.auth import authenticate_user
-from app.core.security import create_access_token, get_password_hash
-from app.db.session import get_db
+from app.core.auth import Principal, authenticate_user, load_principal
+from app.core.revocation import get_revocation_store
+from app.core.security import (
+    REFRESH_TOKEN_TYPE, create_access_token, create_refresh_token,
+    get_password_hash_async, revoke_user_tokens,
+)
+from app.db.session import DatabaseRunner, get_db_runner
 from app.db.models.user import User, UserRole
-from app.schemas.user import Token, UserCreate, User as UserSchema
+from app.schemas.user import RefreshTokenRequest, Token, TokenPayload, UserCreate, User as UserSchema
 
 router = APIRouter()
 
+def issue_tokens(principal: Principal) -> dict:
+    """Access token with the principal's claims plus a refresh token"""
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return {
+        "access_token": create_access_token(
+            principal.id,
+            expires_delta=access_token_expires,
+            role=principal.role,
+            is_active=principal.is_active,
+        ),
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(principal.id),
+        "expires_in": int(access_token_expires.total_seconds()),
+    }
+
+def decode_refresh_token(token: str) -> TokenPayload:
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = TokenPayload(**jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        ))
+    except (JWTError, ValidationError):
+        raise invalid
+    if payload.type != REFRESH_TOKEN_TYPE or payload.sub is None or not payload.jti:
+        raise invalid
+
+    store = get_revocation_store()
+    if store.is_token_revoked(payload.jti):
+        # A rotated token came back: it was stolen or replayed, so cut off
+        # every session of this user
+        revoke_user_tokens(payload.sub)
+        raise invalid
+    if store.is_user_revoked(payload.sub, payload.iat or 0):
+        raise invalid
+    return payload
+
 @router.post("/login", response_model=Token)
-def login_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_access_token(
+    db: DatabaseRunner = Depends(get_db_runner), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
+    and a refresh token to renew it
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
+    principal = await authenticate_user(db, form_data.username, form_data.password)
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": create_access_token(
-            user.id, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+    return issue_tokens(principal)
 
-@router.post("/register", response_model=UserSchema)
-def register_user(
-    *, db: Session = Depends(get_db), user_in: UserCreate
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    *, db: DatabaseRunner = Depends(get_db_runner), token_in: RefreshTokenRequest
 ) -> Any:
-    user = db.query(User).filter(User.username == user_in.username).first()
-    if user:
+    """
+    Exchange a refresh token for a new token pair.
+    The user row is read here, so role and active changes reach the access
+    token claims on the next refresh. The old refresh token is revoked.
+    """
+    payload = decode_refresh_token(token_in.refresh_token)
+
+    principal = await db.run(load_principal, payload.sub)
+    if principal is None or not principal.is_active:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
         )
 
-    user = db.query(User).filter(User.email == user_in.email).first()
-    if user:
+    if not get_revocation_store().revoke_if_active(payload.jti, payload.exp):
+        # A concurrent refresh rotated this token first, same as a replay
+        revoke_user_tokens(payload.sub)
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered",
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
         )
+    return issue_tokens(principal)
 
-    user = User(
-        username=user_in.username,
-        email=user_in.email,
-        hashed_password=get_password_hash(user_in.password),
-        display_name=user_in.display_name or user_in.username,
-        role=UserRole.USER,
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
\ No newline at end of file
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(*, token_in: RefreshTokenRequest) -> None:
+    """
+    Revoke a refresh token. The access token expires on its own shortly
+    """
+    payload = decode_refresh_token(token_in.refresh_token)
+    get_revocation_store().revoke_token(payload.jti, payload.exp)
+
+@router.post("/register", response_model=UserSchema)
+async def register_user(
+    *, db: DatabaseRunner = Depends(get_db_runner), user_in: UserCreate
+) -> Any:
+    # Duplicates are rejected before hashing, so they don't take a slot of
+    # the password pool
+    def check_available(session: Session) -> None:
+        user = session.query(User).filter(User.username == user_in.username).first()
+        if user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username already registered",
+            )
+
+        user = session.query(User).filter(User.email == user_in.email).first()
+        if user:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email already registered",
+            )
+
+    await db.run(check_available)
+    hashed_password = await get_password_hash_async(user_in.password)
+
+    def create(session: Session) -> UserSchema:
+        user = User(
+            username=user_in.username,
+            email=user_in.email,
+            hashed_password=hashed_password,
+            display_name=user_in.display_name or user_in.username,
+            role=UserRole.USER,
+        )
+        session.add(user)
+        try:
+            session.commit()
+        except IntegrityError:
+            # A concurrent registration took the name while we were hashing
+            session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username or email already registered",
+            )
+        session.refresh(user)
+        return UserSchema.model_validate(user, from_attributes=True)
+
+    return await db.run(create)
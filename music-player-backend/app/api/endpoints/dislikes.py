@@ -1,55 +1,49 @@
-from typing import Any
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 
-from app.core.auth import get_current_user
+from app.core.auth import Principal, get_current_user
+from app.core.pagination import CountMode, paginate
 from app.db.session import get_db
 from app.db.models.user import User
 from app.db.models.track import Track
 from app.db.models.dislike import Dislike
 from app.db.models.favorite import Favorite
 from app.schemas.dislike import DislikeList, DislikeWithTrack
+from app.services.track_service import invalidate_track_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=DislikeList)
 def get_dislikes(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
 ) -> Any:
     """
     Get current user's disliked tracks
     """
-    # Get total count for pagination
-    total = db.query(Dislike).filter(Dislike.user_id == current_user.id).count()
-    
     # Get dislikes with track details
-    dislikes = (
+    query = (
         db.query(Dislike)
         .filter(Dislike.user_id == current_user.id)
         .join(Track)
-        .offset((page - 1) * size)
-        .limit(size)
-        .all()
+        # Fill dislike.track from the join instead of one lazy load per item
+        .options(contains_eager(Dislike.track))
     )
     
-    return {
-        "items": dislikes,
-        "total": total,
-        "page": page,
-        "size": size,
-        "pages": (total + size - 1) // size
-    }
+    return paginate(query, scope="dislikes", page=page, size=size, cursor=cursor, count=count)
 
 @router.post("/{track_id}", response_model=DislikeWithTrack)
 def add_dislike(
     *,
     db: Session = Depends(get_db),
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     """
     Add track to dislikes
@@ -87,6 +81,7 @@ def add_dislike(
     db.add(dislike)
     db.commit()
     db.refresh(dislike)
+    invalidate_track_cache(track_id)
     
     return dislike
 
@@ -95,7 +90,7 @@ def remove_dislike(
     *,
     db: Session = Depends(get_db),
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> None:
     """
     Remove track from dislikes
@@ -111,4 +106,5 @@ def remove_dislike(
     
     # Remove from dislikes
     db.delete(dislike)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_track_cache(track_id)
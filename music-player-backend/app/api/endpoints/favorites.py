@@ -1,50 +1,50 @@
-from typing import Any
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 
-from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.core.auth import Principal, get_current_user
+from app.core.pagination import CountMode, paginate
+from app.db.session import DatabaseRunner, get_db, get_db_runner
 from app.db.models.user import User
 from app.db.models.track import Track
 from app.db.models.favorite import Favorite
 from app.db.models.dislike import Dislike
 from app.schemas.favorite import FavoriteList, FavoriteWithTrack
+from app.services.track_service import invalidate_track_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=FavoriteList)
-def get_favorites(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_favorites(
+    db: DatabaseRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_user),
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
 ) -> Any:
-    total = db.query(Favorite).filter(Favorite.user_id == current_user.id).count()
+    def load(session: Session) -> dict:
+        query = (
+            session.query(Favorite)
+            .filter(Favorite.user_id == current_user.id)
+            .join(Track)
+            # Fill favorite.track from the join instead of one lazy load per item
+            .options(contains_eager(Favorite.track))
+        )
 
-    favorites = (
-        db.query(Favorite)
-        .filter(Favorite.user_id == current_user.id)
-        .join(Track)
-        .offset((page - 1) * size)
-        .limit(size)
-        .all()
-    )
+        result = paginate(query, scope="favorites", page=page, size=size, cursor=cursor, count=count)
+        result["items"] = [FavoriteWithTrack.model_validate(item, from_attributes=True) for item in result["items"]]
+        return result
 
-    return {
-        "items": favorites,
-        "total": total,
-        "page": page,
-        "size": size,
-        "pages": (total + size - 1) // size
-    }
+    return await db.run(load)
 
 @router.post("/{track_id}", response_model=FavoriteWithTrack)
 def add_favorite(
     *,
     db: Session = Depends(get_db),
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     track = db.query(Track).filter(Track.id == track_id).first()
     if not track:
@@ -73,6 +73,7 @@ def add_favorite(
     db.add(favorite)
     db.commit()
     db.refresh(favorite)
+    invalidate_track_cache(track_id)
 
     return favorite
 
@@ -81,7 +82,7 @@ def remove_favorite(
     *,
     db: Session = Depends(get_db),
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> None:
     """
     Remove track from favorites
@@ -97,4 +98,5 @@ def remove_favorite(
     
     # Remove from favorites
     db.delete(favorite)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_track_cache(track_id)
@@ -1,13 +1,36 @@
-from fastapi import APIRouter
-from typing import List, Dict
+from typing import Dict, List
 
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+
+from app.core.response_cache import conditional_response, render, response_cache
+from app.db.models.genre_stat import genre_counts
 from app.db.models.track import Genre
+from app.db.session import DatabaseRunner, get_db_runner
+from app.services.track_service import GENRE_COUNTS_CACHE
 
 router = APIRouter()
 
+# The genre list only changes with a deploy, so it is serialized once and
+# its ETag stays the same for the lifetime of the process
+GENRES = render([{"value": genre.value, "name": genre.value} for genre in Genre])
+
 @router.get("/", response_model=List[Dict[str, str]])
-def get_all_genres():
+async def get_all_genres(request: Request):
     """
     Get all available music genres
     """
-    return [{"value": genre.value, "name": genre.value} for genre in Genre]
\ No newline at end of file
+    return conditional_response(request, GENRES, cache_control="public, max-age=3600")
+
+@router.get("/counts", response_model=Dict[str, int])
+async def get_genre_counts(
+    request: Request,
+    db: DatabaseRunner = Depends(get_db_runner),
+):
+    """
+    Number of tracks per genre
+    """
+    async def build():
+        return await db.run(genre_counts)
+
+    return await response_cache.respond(request, GENRE_COUNTS_CACHE, {}, build)
@@ -0,0 +1,40 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core.auth import Principal, get_current_admin_user
+from app.core.response_cache import response_cache
+from app.core.security import password_hasher
+from app.db.pool import pool_status
+
+router = APIRouter()
+
+@router.get("/pool", response_model=Dict[str, Any])
+def get_pool_metrics(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Connection pool state of this worker: checked-out and overflow
+    connections, timeouts and wait time / concurrency histograms
+    """
+    return pool_status()
+
+@router.get("/passwords", response_model=Dict[str, Any])
+def get_password_metrics(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Password hashing pool: running and queued jobs, rejections, queue wait
+    and bcrypt time histograms
+    """
+    return password_hasher.stats()
+
+@router.get("/response-cache", response_model=Dict[str, Any])
+def get_response_cache_metrics(
+    current_user: Principal = Depends(get_current_admin_user),
+) -> Any:
+    """
+    Public catalog response cache of this worker: hits, misses, 304s and
+    invalidations
+    """
+    return response_cache.stats()
@@ -3,19 +3,24 @@ import shutil
 import uuid
 from typing import Any, Optional, List
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status, UploadFile, File, Form
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.config import settings
-from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.core.auth import Principal, get_current_user
+from app.core.pagination import CountMode, paginate
+from app.db.session import DatabaseRunner, get_db, get_db_runner
 from app.db.models.user import User
 from app.db.models.track import Track
 from app.db.models.playlist import Playlist, PlaylistTrack
 from app.schemas.playlist import (
     PlaylistCreate, PlaylistUpdate, Playlist as PlaylistSchema, 
-    PlaylistWithTracks, AddTrackToPlaylist, UpdateTrackPosition, PlaylistList
+    PlaylistWithTracks, AddTrackToPlaylist, UpdateTrackPosition, PlaylistList,
+    PlaylistTrackBatch, PlaylistTrackBatchResult
+)
+from app.services.playlist_service import (
+    apply_playlist_operations, get_owned_playlist, load_playlist_with_tracks, place_track,
+    rebalance_playlist_in_background
 )
 
 router = APIRouter()
@@ -26,49 +31,42 @@ def validate_file_extension(filename: str, allowed_extensions: List[str]) -> boo
     return extension in allowed_extensions
 
 @router.get("/", response_model=PlaylistList)
-def get_playlists(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+async def get_playlists(
+    db: DatabaseRunner = Depends(get_db_runner),
+    current_user: Principal = Depends(get_current_user),
     is_public: Optional[bool] = None,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
 ) -> Any:
-    # Start with user's playlists
-    query = db.query(Playlist).filter(Playlist.user_id == current_user.id)
-    
-    # If not filtering for is_public=False, also show all public playlists from other users
-    if is_public is None or is_public:
-        # Add public playlists from other users
-        public_query = db.query(Playlist).filter(
-            Playlist.user_id != current_user.id,
-            Playlist.is_public == True
-        )
-        
-        query = query.union(public_query)
-    else:
-        # Only private playlists from current user
-        query = query.filter(Playlist.is_public == False)
-    
-    # Get total count for pagination
-    total = query.count()
-    
-    # Apply pagination
-    playlists = query.offset((page - 1) * size).limit(size).all()
-    
-    return {
-        "items": playlists,
-        "total": total,
-        "page": page,
-        "size": size,
-        "pages": (total + size - 1) // size
-    }
+    def load(session: Session) -> dict:
+        # If not filtering for is_public=False, show user's playlists plus all
+        # public playlists from other users. A single OR filter instead of a
+        # UNION keeps both the count and the page query a plain index scan.
+        if is_public is None or is_public:
+            query = session.query(Playlist).filter(
+                (Playlist.user_id == current_user.id) | (Playlist.is_public == True)
+            )
+        else:
+            # Only private playlists from current user
+            query = session.query(Playlist).filter(
+                Playlist.user_id == current_user.id,
+                Playlist.is_public == False
+            )
+
+        result = paginate(query, scope="playlists", page=page, size=size, cursor=cursor, count=count)
+        result["items"] = [PlaylistSchema.model_validate(item, from_attributes=True) for item in result["items"]]
+        return result
+
+    return await db.run(load)
 
 @router.post("/", response_model=PlaylistSchema)
 def create_playlist(
     *,
     db: Session = Depends(get_db),
     playlist_in: PlaylistCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     playlist = Playlist(
         name=playlist_in.name,
@@ -84,36 +82,21 @@ def create_playlist(
     return playlist
 
 @router.get("/{playlist_id}", response_model=PlaylistWithTracks)
-def get_playlist(
+async def get_playlist(
     *,
-    db: Session = Depends(get_db),
+    db: DatabaseRunner = Depends(get_db_runner),
     playlist_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
+    tracks_offset: int = Query(0, ge=0),
+    tracks_limit: Optional[int] = Query(None, ge=1, le=500),
 ) -> Any:
-    playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-    
-    # Check access
-    if playlist.user_id != current_user.id and not playlist.is_public:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to view this playlist"
-        )
-    
-    # Get tracks
-    tracks = (
-        db.query(PlaylistTrack)
-        .filter(PlaylistTrack.playlist_id == playlist_id)
-        .join(Track)
-        .order_by(PlaylistTrack.position)
-        .all()
+    """
+    Playlist with its tracks in order; long playlists can be read in
+    pages of tracks with tracks_offset/tracks_limit
+    """
+    return await db.run(
+        load_playlist_with_tracks, playlist_id, current_user, tracks_offset, tracks_limit
     )
-    
-    # Return playlist with tracks
-    playlist.tracks = tracks
-    
-    return playlist
 
 @router.put("/{playlist_id}", response_model=PlaylistSchema)
 def update_playlist(
@@ -121,7 +104,7 @@ def update_playlist(
     db: Session = Depends(get_db),
     playlist_id: int,
     playlist_in: PlaylistUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
     if not playlist:
@@ -154,7 +137,7 @@ def delete_playlist(
     *,
     db: Session = Depends(get_db),
     playlist_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> None:
 
     playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
@@ -175,23 +158,18 @@ def delete_playlist(
 def add_track_to_playlist(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     playlist_id: int,
     track_in: AddTrackToPlaylist,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     """
     Add track to playlist
     """
-    # Check if playlist exists and current user is the owner
-    playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-    
-    if playlist.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to modify this playlist"
-        )
+    # Check if playlist exists and current user is the owner. The row stays
+    # locked until commit, so a rebalance can't move the neighbours between
+    # place_track reading their keys and the insert
+    get_owned_playlist(db, playlist_id, current_user, lock=True)
     
     # Check if track exists
     track = db.query(Track).filter(Track.id == track_in.track_id).first()
@@ -210,23 +188,9 @@ def add_track_to_playlist(
             detail="Track is already in playlist"
         )
     
-    # Determine position
-    position = track_in.position
-    if position is None:
-        # Add to the end
-        max_position = db.query(func.max(PlaylistTrack.position)).filter(
-            PlaylistTrack.playlist_id == playlist_id
-        ).scalar() or 0
-        position = max_position + 1
-    else:
-        # Shift tracks if position is specified
-        db.query(PlaylistTrack).filter(
-            PlaylistTrack.playlist_id == playlist_id,
-            PlaylistTrack.position >= position
-        ).update(
-            {PlaylistTrack.position: PlaylistTrack.position + 1},
-            synchronize_session=False
-        )
+    # Sort key between the neighbours at the requested position, or after
+    # the last track; other rows keep theirs
+    position, crowded = place_track(db, playlist_id, track_in.position)
     
     # Add track to playlist
     playlist_track = PlaylistTrack(
@@ -237,32 +201,43 @@ def add_track_to_playlist(
     
     db.add(playlist_track)
     db.commit()
+    if crowded:
+        background_tasks.add_task(rebalance_playlist_in_background, playlist_id)
     
     # Return updated playlist
-    return get_playlist(db=db, playlist_id=playlist_id, current_user=current_user)
+    return load_playlist_with_tracks(db, playlist_id, current_user)
+
+@router.post("/{playlist_id}/tracks/batch", response_model=PlaylistTrackBatchResult)
+def batch_update_playlist_tracks(
+    *,
+    db: Session = Depends(get_db),
+    playlist_id: int,
+    batch_in: PlaylistTrackBatch,
+    current_user: Principal = Depends(get_current_user),
+) -> Any:
+    """
+    Add, move and remove tracks in one request.
+    Operations apply in order and all-or-nothing; the response lists only
+    the positions that changed instead of the whole playlist.
+    """
+    return apply_playlist_operations(db, playlist_id, batch_in.operations, current_user)
 
 @router.put("/{playlist_id}/tracks/{track_id}", response_model=PlaylistWithTracks)
 def update_track_position(
     *,
     db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
     playlist_id: int,
     track_id: int,
     position_in: UpdateTrackPosition,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     """
     Update track position in playlist
     """
-    # Check if playlist exists and current user is the owner
-    playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-    
-    if playlist.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to modify this playlist"
-        )
+    # Check if playlist exists and current user is the owner, locked like
+    # in add_track_to_playlist
+    get_owned_playlist(db, playlist_id, current_user, lock=True)
     
     # Check if track is in playlist
     playlist_track = db.query(PlaylistTrack).filter(
@@ -273,38 +248,17 @@ def update_track_position(
     if not playlist_track:
         raise HTTPException(status_code=404, detail="Track not found in playlist")
     
-    # Get current position
-    current_position = playlist_track.position
-    new_position = position_in.position
-    
-    # Update positions
-    if current_position < new_position:
-        # Moving track down
-        db.query(PlaylistTrack).filter(
-            PlaylistTrack.playlist_id == playlist_id,
-            PlaylistTrack.position > current_position,
-            PlaylistTrack.position <= new_position
-        ).update(
-            {PlaylistTrack.position: PlaylistTrack.position - 1},
-            synchronize_session=False
-        )
-    elif current_position > new_position:
-        # Moving track up
-        db.query(PlaylistTrack).filter(
-            PlaylistTrack.playlist_id == playlist_id,
-            PlaylistTrack.position >= new_position,
-            PlaylistTrack.position < current_position
-        ).update(
-            {PlaylistTrack.position: PlaylistTrack.position + 1},
-            synchronize_session=False
-        )
-    
-    # Update track position
-    playlist_track.position = new_position
+    # Only the moved row gets a new sort key
+    position, crowded = place_track(
+        db, playlist_id, position_in.position, exclude_row_id=playlist_track.id
+    )
+    playlist_track.position = position
     db.commit()
+    if crowded:
+        background_tasks.add_task(rebalance_playlist_in_background, playlist_id)
     
     # Return updated playlist
-    return get_playlist(db=db, playlist_id=playlist_id, current_user=current_user)
+    return load_playlist_with_tracks(db, playlist_id, current_user)
 
 @router.delete("/{playlist_id}/tracks/{track_id}", response_model=PlaylistWithTracks)
 def remove_track_from_playlist(
@@ -312,18 +266,10 @@ def remove_track_from_playlist(
     db: Session = Depends(get_db),
     playlist_id: int,
     track_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     # Check if playlist exists and current user is the owner
-    playlist = db.query(Playlist).filter(Playlist.id == playlist_id).first()
-    if not playlist:
-        raise HTTPException(status_code=404, detail="Playlist not found")
-    
-    if playlist.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You don't have permission to modify this playlist"
-        )
+    get_owned_playlist(db, playlist_id, current_user)
     
     # Check if track is in playlist
     playlist_track = db.query(PlaylistTrack).filter(
@@ -334,22 +280,9 @@ def remove_track_from_playlist(
     if not playlist_track:
         raise HTTPException(status_code=404, detail="Track not found in playlist")
     
-    # Get position
-    position = playlist_track.position
-    
-    # Delete track from playlist
+    # Delete track from playlist, the others keep their sort keys
     db.delete(playlist_track)
-    
-    # Update positions of other tracks
-    db.query(PlaylistTrack).filter(
-        PlaylistTrack.playlist_id == playlist_id,
-        PlaylistTrack.position > position
-    ).update(
-        {PlaylistTrack.position: PlaylistTrack.position - 1},
-        synchronize_session=False
-    )
-    
     db.commit()
     
     # Return updated playlist
-    return get_playlist(db=db, playlist_id=playlist_id, current_user=current_user)
\ No newline at end of file
+    return load_playlist_with_tracks(db, playlist_id, current_user)
@@ -1,64 +1,61 @@
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 
-from app.core.auth import get_current_user
-from app.db.session import get_db
+from app.core.auth import Principal, get_current_user
+from app.core.pagination import CountMode, paginate
+from app.db.session import DatabaseRunner, get_db, get_db_runner
 from app.db.models.user import User
 from app.db.models.track import Track
 from app.db.models.review import Review
 from app.schemas.review import ReviewCreate, ReviewUpdate, ReviewWithUser, ReviewList
+from app.services.track_service import invalidate_track_cache
 
 router = APIRouter()
 
 @router.get("/", response_model=ReviewList)
-def get_reviews(
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user),
+async def get_reviews(
+    db: DatabaseRunner = Depends(get_db_runner),
+    current_user: Optional[Principal] = Depends(get_current_user),
     track_id: Optional[int] = None,
     user_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
 ) -> Any:
     """
     Get reviews with optional filtering by track or user
     """
-    query = db.query(Review)
-    
-    # Apply filters
-    if track_id:
-        query = query.filter(Review.track_id == track_id)
-    
-    if user_id:
-        query = query.filter(Review.user_id == user_id)
-    
-    # Get total count for pagination
-    total = query.count()
-    
-    # Apply pagination
-    reviews = (
-        query
-        .join(User)
-        .offset((page - 1) * size)
-        .limit(size)
-        .all()
-    )
-    
-    return {
-        "items": reviews,
-        "total": total,
-        "page": page,
-        "size": size,
-        "pages": (total + size - 1) // size
-    }
+    def load(session: Session) -> dict:
+        query = session.query(Review)
+
+        # Apply filters
+        if track_id:
+            query = query.filter(Review.track_id == track_id)
+
+        if user_id:
+            query = query.filter(Review.user_id == user_id)
+
+        # Fill review.user from the join instead of one lazy load per item
+        query = query.join(User).options(contains_eager(Review.user))
+
+        result = paginate(
+            query, scope="reviews", page=page, size=size,
+            cursor=cursor, count=count
+        )
+        result["items"] = [ReviewWithUser.model_validate(item, from_attributes=True) for item in result["items"]]
+        return result
+
+    return await db.run(load)
 
 @router.post("/", response_model=ReviewWithUser)
 def create_review(
     *,
     db: Session = Depends(get_db),
     review_in: ReviewCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     """
     Create new review
@@ -90,23 +87,26 @@ def create_review(
     db.add(review)
     db.commit()
     db.refresh(review)
+    invalidate_track_cache(review.track_id)
     
     return review
 
 @router.get("/{review_id}", response_model=ReviewWithUser)
-def get_review(
+async def get_review(
     *,
-    db: Session = Depends(get_db),
+    db: DatabaseRunner = Depends(get_db_runner),
     review_id: int,
 ) -> Any:
     """
     Get review by ID
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
-    if not review:
-        raise HTTPException(status_code=404, detail="Review not found")
-    
-    return review
+    def load(session: Session) -> ReviewWithUser:
+        review = session.query(Review).filter(Review.id == review_id).first()
+        if not review:
+            raise HTTPException(status_code=404, detail="Review not found")
+        return ReviewWithUser.model_validate(review, from_attributes=True)
+
+    return await db.run(load)
 
 @router.put("/{review_id}", response_model=ReviewWithUser)
 def update_review(
@@ -114,7 +114,7 @@ def update_review(
     db: Session = Depends(get_db),
     review_id: int,
     review_in: ReviewUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> Any:
     """
     Update review
@@ -144,7 +144,7 @@ def delete_review(
     *,
     db: Session = Depends(get_db),
     review_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_user),
 ) -> None:
     """
     Delete review
@@ -161,5 +161,7 @@ def delete_review(
         )
     
     # Delete review
+    track_id = review.track_id
     db.delete(review)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_track_cache(track_id)
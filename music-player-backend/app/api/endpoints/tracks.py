@@ -1,21 +1,34 @@
 import os
-import shutil
 from typing import Any, List, Optional
-import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import exists
 
 from app.config import settings
-from app.core.auth import get_current_user, get_current_admin_user
-from app.db.session import get_db
+from app.core.auth import Principal, get_current_user, get_current_admin_user
+from app.core.pagination import CountMode, paginate
+from app.core.response_cache import response_cache
+from app.core.streaming import RangeFileResponse
+from app.db.session import DatabaseRunner, get_db, get_db_runner
 from app.db.models.user import User
 from app.db.models.track import Track, Genre
 from app.db.models.favorite import Favorite
 from app.db.models.dislike import Dislike
-from app.db.models.review import Review
 from app.schemas.track import Track as TrackSchema, TrackCreate, TrackUpdate, TrackWithStats, TrackList
+from app.services.search_service import apply_artist_filter, apply_track_search, fallback_index
+from app.services.audio_probe import AudioProbeError, probe_audio
+from app.services.media_service import release_stored_files, save_upload
+from app.services.track_service import (
+    TRACK_LISTS_CACHE,
+    TRACK_STATS_CACHE,
+    attach_track_stats,
+    build_track_thumbnails,
+    insert_track,
+    invalidate_track_cache,
+    track_cache_namespace,
+)
 
 router = APIRouter()
 
@@ -25,113 +38,169 @@ def validate_file_extension(filename: str, allowed_extensions: List[str]) -> boo
     return extension in allowed_extensions
 
 @router.get("/", response_model=TrackList)
-def get_tracks(
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user),
+async def get_tracks(
+    request: Request,
+    db: DatabaseRunner = Depends(get_db_runner),
+    current_user: Optional[Principal] = Depends(get_current_user),
     genre: Optional[str] = None,
     artist: Optional[str] = None,
     search: Optional[str] = None,
     page: int = Query(1, ge=1),
     size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: CountMode = CountMode.EXACT,
+    include: Optional[str] = Query(None, pattern="^stats$"),
 ) -> Any:
     # Делаем этот эндпоинт общедоступным (не требуя авторизации)
-    query = db.query(Track)
-
-    if genre:
-        try:
-            # Try to convert string to Genre enum
-            genre_enum = Genre.from_string(genre)
-            query = query.filter(Track.genre == genre_enum)
-        except (KeyError, ValueError) as e:
-            # Log the error
-            print(f"Invalid genre filter: {e}")
-            # Return empty result instead of crashing
-            return {
-                "items": [],
-                "total": 0,
-                "page": page,
-                "size": size,
-                "pages": 0
-            }
-
-    if artist:
-        query = query.filter(Track.artist.ilike(f"%{artist}%"))
-
-    if search:
-        query = query.filter(
-            (Track.title.ilike(f"%{search}%")) |
-            (Track.artist.ilike(f"%{search}%"))
+    def load(session: Session) -> dict:
+        query = session.query(Track)
+
+        if genre:
+            try:
+                # Try to convert string to Genre enum
+                genre_enum = Genre.from_string(genre)
+                query = query.filter(Track.genre == genre_enum)
+            except (KeyError, ValueError) as e:
+                # Log the error
+                print(f"Invalid genre filter: {e}")
+                # Return empty result instead of crashing
+                return {
+                    "items": [],
+                    "total": 0,
+                    "page": page,
+                    "size": size,
+                    "pages": 0
+                }
+
+        if artist:
+            query = apply_artist_filter(query, artist)
+
+        if search:
+            # Ranked full-text search, most relevant tracks first
+            query = apply_track_search(session, query, search)
+
+        result = paginate(
+            query, scope="tracks", page=page, size=size, cursor=cursor, count=count,
+            ordered=bool(search)
         )
 
-    # Get total count for pagination
-    total = query.count()
+        if include == "stats":
+            # Counts and the user's like/dislike flags for the whole page, so the
+            # client doesn't have to fetch every track separately
+            result["items"] = attach_track_stats(session, result["items"], current_user)
+        else:
+            result["items"] = [TrackSchema.model_validate(track, from_attributes=True) for track in result["items"]]
 
-    # Apply pagination
-    tracks = query.offset((page - 1) * size).limit(size).all()
+        return result
 
-    return {
-        "items": tracks,
-        "total": total,
-        "page": page,
-        "size": size,
-        "pages": (total + size - 1) // size
-    }
+    if current_user is None:
+        # Anonymous responses are the same for everyone, serve them from
+        # the response cache with an ETag
+        return await response_cache.respond(
+            request,
+            TRACK_STATS_CACHE if include == "stats" else TRACK_LISTS_CACHE,
+            {
+                "genre": genre, "artist": artist, "search": search, "page": page,
+                "size": size, "cursor": cursor, "count": count, "include": include,
+            },
+            lambda: db.run(load),
+        )
+
+    return await db.run(load)
 
 @router.get("/{track_id}", response_model=TrackWithStats)
-def get_track(
+async def get_track(
     *,
-    db: Session = Depends(get_db),
+    db: DatabaseRunner = Depends(get_db_runner),
     track_id: int,
-    current_user: Optional[User] = Depends(get_current_user),
+    request: Request,
+    current_user: Optional[Principal] = Depends(get_current_user),
 ) -> Any:
     # Делаем этот эндпоинт общедоступным (не требуя авторизации)
-    track = db.query(Track).filter(Track.id == track_id).first()
-    if not track:
-        raise HTTPException(status_code=404, detail="Track not found")
+    # Counters are denormalized on tracks and the per-user flags are EXISTS
+    # subqueries, so the whole response is a single indexed lookup
+    def load(session: Session) -> TrackWithStats:
+        query = session.query(Track).filter(Track.id == track_id)
 
-    favorites_count = db.query(func.count(Favorite.id)).filter(Favorite.track_id == track_id).scalar()
-    dislikes_count = db.query(func.count(Dislike.id)).filter(Dislike.track_id == track_id).scalar()
-    reviews_count = db.query(func.count(Review.id)).filter(Review.track_id == track_id).scalar()
-
-    is_favorited = None
-    is_disliked = None
-    if current_user:
-        is_favorited = db.query(Favorite).filter(
-            Favorite.user_id == current_user.id,
-            Favorite.track_id == track_id
-        ).first() is not None
-
-        is_disliked = db.query(Dislike).filter(
-            Dislike.user_id == current_user.id,
-            Dislike.track_id == track_id
-        ).first() is not None
-
-    result = TrackWithStats(
-        id=track.id,
-        title=track.title,
-        artist=track.artist,
-        genre=track.genre,
-        duration=track.duration,
-        cover_path=track.cover_path,
-        audio_path=track.audio_path,
-        favorites_count=favorites_count,
-        dislikes_count=dislikes_count,
-        reviews_count=reviews_count,
-        is_favorited=is_favorited,
-        is_disliked=is_disliked
+        is_favorited = None
+        is_disliked = None
+        if current_user:
+            row = query.add_columns(
+                exists().where(
+                    Favorite.user_id == current_user.id,
+                    Favorite.track_id == Track.id
+                ),
+                exists().where(
+                    Dislike.user_id == current_user.id,
+                    Dislike.track_id == Track.id
+                ),
+            ).first()
+            track, is_favorited, is_disliked = row if row else (None, None, None)
+        else:
+            track = query.first()
+
+        if not track:
+            raise HTTPException(status_code=404, detail="Track not found")
+
+        result = TrackWithStats.model_validate(track, from_attributes=True)
+        result.is_favorited = is_favorited
+        result.is_disliked = is_disliked
+        return result
+
+    if current_user is None:
+        return await response_cache.respond(
+            request, track_cache_namespace(track_id), {}, lambda: db.run(load)
+        )
+
+    return await db.run(load)
+
+@router.api_route("/{track_id}/stream", methods=["GET", "HEAD"])
+async def stream_track(
+    *,
+    db: DatabaseRunner = Depends(get_db_runner),
+    track_id: int,
+    request: Request,
+) -> Any:
+    """
+    Stream track audio with Range, ETag and Last-Modified support
+    """
+    audio_path = await db.run(
+        lambda session: session.query(Track.audio_path).filter(Track.id == track_id).scalar()
     )
+    if not audio_path:
+        raise HTTPException(status_code=404, detail="Track not found")
+
+    relative_path = audio_path.removeprefix("/media/")
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
 
-    return result
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        # nginx handles ranges and sends the file with sendfile
+        return Response(
+            headers={"X-Accel-Redirect": settings.MEDIA_ACCEL_REDIRECT_PREFIX + relative_path}
+        )
+
+    try:
+        stat_result = await run_in_threadpool(os.stat, full_path)
+        return RangeFileResponse(
+            full_path,
+            request.headers,
+            method=request.method,
+            chunk_size=settings.STREAM_CHUNK_SIZE_KB * 1024,
+            stat_result=stat_result,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Audio file not found")
 
 @router.post("/", response_model=TrackSchema)
-def create_track(
+async def create_track(
     *,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user),
+    background_tasks: BackgroundTasks,
+    current_user: Principal = Depends(get_current_admin_user),
     title: str = Form(...),
     artist: str = Form(...),
     genre: str = Form(...),
-    duration: float = Form(...),
+    duration: Optional[float] = Form(None),
     cover: UploadFile = File(...),
     audio: UploadFile = File(...),
 ) -> Any:
@@ -157,41 +226,62 @@ def create_track(
             detail=f"Invalid genre. Allowed genres: {', '.join([g.value for g in Genre])}"
         )
 
-    cover_filename = f"{uuid.uuid4()}.{cover.filename.split('.')[-1].lower()}"
-    audio_filename = f"{uuid.uuid4()}.{audio.filename.split('.')[-1].lower()}"
-
-    cover_path = os.path.join(settings.COVERS_DIR, cover_filename)
-    audio_path = os.path.join(settings.TRACKS_DIR, audio_filename)
-
+    # Files are streamed in chunks with size limits, disk I/O stays off the
+    # event loop and nothing is visible in media/ until fully written
+    stored = []
     try:
-        cover_full_path = os.path.join(settings.MEDIA_ROOT, cover_path)
-        with open(cover_full_path, "wb") as buffer:
-            shutil.copyfileobj(cover.file, buffer)
-
-        audio_full_path = os.path.join(settings.MEDIA_ROOT, audio_path)
-        with open(audio_full_path, "wb") as buffer:
-            shutil.copyfileobj(audio.file, buffer)
-    except Exception as e:
-        if os.path.exists(cover_full_path):
-            os.remove(cover_full_path)
-        if os.path.exists(audio_full_path):
-            os.remove(audio_full_path)
+        stored.append(await save_upload(db, cover, settings.COVERS_DIR, settings.MAX_COVER_SIZE_MB))
+        stored.append(await save_upload(db, audio, settings.TRACKS_DIR, settings.MAX_TRACK_SIZE_MB))
+    except HTTPException:
+        await run_in_threadpool(release_stored_files, db, stored)
+        raise
+    except OSError as e:
+        await run_in_threadpool(release_stored_files, db, stored)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error saving files: {str(e)}"
         )
+    cover_file, audio_file = stored
 
-    track = Track(
-        title=title,
-        artist=artist,
-        genre=track_genre,
-        duration=duration,
-        cover_path=f"/media/{cover_path}",
-        audio_path=f"/media/{audio_path}"
-    )
+    # Duration and stream parameters come from the audio headers, the
+    # client value is only a fallback for files we can't parse
+    try:
+        audio_info = await run_in_threadpool(probe_audio, audio_file.full_path)
+    except (AudioProbeError, OSError):
+        audio_info = None
+
+    if audio_info is None and duration is None:
+        await run_in_threadpool(release_stored_files, db, stored)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read audio duration, please provide it"
+        )
+
+    try:
+        track = await run_in_threadpool(
+            insert_track,
+            db,
+            title=title,
+            artist=artist,
+            genre=track_genre,
+            duration=audio_info.duration if audio_info else duration,
+            cover_path=cover_file.url,
+            audio_path=audio_file.url,
+            file_size=audio_file.size,
+            audio_info=audio_info,
+        )
+    except Exception:
+        # Frees the write lock before the references are released
+        await run_in_threadpool(db.rollback)
+        raise
+    finally:
+        # The track holds its own references now, or failed to insert
+        await run_in_threadpool(release_stored_files, db, stored)
+
+    fallback_index.invalidate()
+    invalidate_track_cache(track.id, catalog=True)
 
-    db.add(track)
-    db.commit()
-    db.refresh(track)
+    # Thumbnails are rendered after the response is sent
+    background_tasks.add_task(build_track_thumbnails, track.id, cover_file.relative_path)
 
-    return track
\ No newline at end of file
+    return track
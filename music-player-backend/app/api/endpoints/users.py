@@ -3,8 +3,8 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.auth import get_current_user, get_current_admin_user
-from app.core.security import get_password_hash, verify_password
+from app.core.auth import Principal, get_current_admin_user, get_current_user_record, invalidate_principal
+from app.core.security import get_password_hash, revoke_user_tokens, verify_password
 from app.db.session import get_db
 from app.db.models.user import User, UserRole
 from app.schemas.user import User as UserSchema, UserUpdate
@@ -13,7 +13,7 @@ router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
 def get_current_user_info(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_record),
 ) -> Any:
     """
     Get current user info
@@ -25,7 +25,7 @@ def update_current_user(
     *,
     db: Session = Depends(get_db),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_record),
 ) -> Any:
     """
     Update current user
@@ -64,6 +64,10 @@ def update_current_user(
     db.add(current_user)
     db.commit()
     db.refresh(current_user)
+    invalidate_principal(current_user.id)
+    if user_in.password is not None:
+        # Sessions opened with the old password end here
+        revoke_user_tokens(current_user.id)
     
     return current_user
 
@@ -71,7 +75,7 @@ def update_current_user(
 @router.get("/", response_model=List[UserSchema])
 def get_users(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
@@ -86,7 +90,7 @@ def get_user(
     *,
     db: Session = Depends(get_db),
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
 ) -> Any:
     """
     Get user by ID (admin only)
@@ -102,7 +106,7 @@ def update_user(
     db: Session = Depends(get_db),
     user_id: int,
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
 ) -> Any:
     """
     Update user (admin only)
@@ -145,6 +149,9 @@ def update_user(
     db.add(user)
     db.commit()
     db.refresh(user)
+    invalidate_principal(user.id)
+    if user_in.password is not None:
+        revoke_user_tokens(user.id)
     
     return user
 
@@ -153,7 +160,7 @@ def delete_user(
     *,
     db: Session = Depends(get_db),
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
 ) -> None:
     """
     Delete user (admin only)
@@ -170,4 +177,6 @@ def delete_user(
         )
     
     db.delete(user)
-    db.commit()
\ No newline at end of file
+    db.commit()
+    invalidate_principal(user_id)
+    revoke_user_tokens(user_id)
\ No newline at end of file
@@ -1,42 +1,109 @@
-from typing import Optional
+from dataclasses import dataclass
+from typing import Optional, Tuple
 from datetime import datetime, timedelta
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.db.session import get_db
-from app.db.models.user import User
+from app.core.cache import TTLCache
+from app.core.revocation import get_revocation_store
+from app.db.session import DatabaseRunner, get_db, get_db_runner
+from app.db.models.user import User, UserRole
 from app.schemas.user import TokenPayload
-from app.core.security import verify_password
+from app.core.security import ACCESS_TOKEN_TYPE, verify_password_async
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False)
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+
+@dataclass(frozen=True)
+class Principal:
+    """What request auth needs to know about a user"""
+    id: int
+    role: UserRole
+    is_active: bool
+
+
+# user id -> Principal, so authenticated requests don't query users
+_principal_cache: TTLCache[Principal] = TTLCache(
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES, ttl=settings.AUTH_CACHE_TTL_SECONDS
+)
+
+
+def invalidate_principal(user_id: int) -> None:
     """
-    Authenticate user with username and password
-    :param db: database session
+    Drop a cached principal, call after changing or deleting a user
+    :param user_id: user id
+    """
+    _principal_cache.pop(user_id)
+
+def _find_credentials(db: Session, username: str) -> Optional[Tuple[Principal, str]]:
+    row = (
+        db.query(User.id, User.role, User.is_active, User.hashed_password)
+        .filter(User.username == username)
+        .first()
+    )
+    db.rollback()
+    if row is None:
+        return None
+    principal = Principal(id=row.id, role=row.role, is_active=bool(row.is_active))
+    return principal, row.hashed_password
+
+def _store_password_hash(db: Session, user_id: int, hashed_password: str) -> None:
+    db.query(User).filter(User.id == user_id).update(
+        {User.hashed_password: hashed_password}, synchronize_session=False
+    )
+    db.commit()
+
+async def authenticate_user(db: DatabaseRunner, username: str, password: str) -> Optional[Principal]:
+    """
+    Authenticate user with username and password.
+    bcrypt runs on the password pool; a hash made with an outdated cost
+    factor is replaced with a fresh one while the plain password is at hand.
+    :param db: database runner
     :param username: username
     :param password: password
-    :return: User object if credentials are valid, None otherwise
+    :return: Principal if credentials are valid, None otherwise
     """
-    user = db.query(User).filter(User.username == username).first()
-    if not user:
+    credentials = await db.run(_find_credentials, username)
+    if not credentials:
         return None
-    if not verify_password(password, user.hashed_password):
+    principal, hashed_password = credentials
+    valid, new_hash = await verify_password_async(password, hashed_password)
+    if not valid:
         return None
-    return user
+    if new_hash:
+        await db.run(_store_password_hash, principal.id, new_hash)
+    return principal
+
+def load_principal(db: Session, user_id: int) -> Optional[Principal]:
+    """Current id, role and is_active of a user straight from the database"""
+    row = (
+        db.query(User.id, User.role, User.is_active)
+        .filter(User.id == user_id)
+        .first()
+    )
+    # Give the connection back to the pool, the endpoint may not need it
+    db.rollback()
+    if row is None:
+        return None
+    return Principal(id=row.id, role=row.role, is_active=bool(row.is_active))
 
-def get_current_user(
-    db: Session = Depends(get_db), token: Optional[str] = Depends(oauth2_scheme)
-) -> Optional[User]:
+async def get_current_user(
+    db: DatabaseRunner = Depends(get_db_runner), token: Optional[str] = Depends(oauth2_scheme)
+) -> Optional[Principal]:
     """
-    Get current user from JWT token
-    :param db: database session
+    Get current user from JWT token.
+    Access tokens carry role and is_active, so they are validated from the
+    claims and the revocation store alone. Older tokens without the claims
+    fall back to the principal cache, which is refreshed from the database
+    every AUTH_CACHE_TTL_SECONDS.
+    :param db: database runner
     :param token: JWT token
-    :return: User object or None if not authenticated
+    :return: Principal or None if not authenticated
     """
     if token is None:
         return None
@@ -48,19 +115,34 @@ def get_current_user(
         token_data = TokenPayload(**payload)
         if token_data.sub is None:
             return None
-    except JWTError:
+    except (JWTError, ValidationError):
         return None
 
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if user is None:
+    if token_data.type not in (None, ACCESS_TOKEN_TYPE):
+        # Refresh tokens only work on /auth/refresh
         return None
-    if not user.is_active:
+    if token_data.iat is not None and get_revocation_store().is_user_revoked(token_data.sub, token_data.iat):
         return None
-    return user
 
-def get_current_active_user(
-    current_user: Optional[User] = Depends(get_current_user),
-) -> User:
+    if token_data.role is not None and token_data.active is not None:
+        if not token_data.active:
+            return None
+        return Principal(id=token_data.sub, role=token_data.role, is_active=True)
+
+    principal = _principal_cache.get(token_data.sub)
+    if principal is None:
+        principal = await db.run(load_principal, token_data.sub)
+        if principal is None:
+            return None
+        _principal_cache.set(principal.id, principal)
+
+    if not principal.is_active:
+        return None
+    return principal
+
+async def get_current_active_user(
+    current_user: Optional[Principal] = Depends(get_current_user),
+) -> Principal:
     """
     Get current active user
     :param current_user: current user
@@ -77,9 +159,9 @@ def get_current_active_user(
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def get_current_admin_user(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
+async def get_current_admin_user(
+    current_user: Principal = Depends(get_current_active_user),
+) -> Principal:
     """
     Get current admin user
     :param current_user: current user
@@ -91,4 +173,24 @@ def get_current_admin_user(
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+def get_current_user_record(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user),
+) -> User:
+    """
+    Full user row for endpoints that read or change the profile itself
+    :param db: database session
+    :param current_user: authenticated principal
+    :return: User object attached to the request session
+    """
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        invalidate_principal(current_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
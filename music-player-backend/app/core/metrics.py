@@ -0,0 +1,121 @@
+import bisect
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+
+class Histogram:
+    """
+    Thread-safe fixed-bucket histogram.
+    Buckets are upper bounds like Prometheus "le" labels, values above the
+    last bound only go into the +Inf bucket.
+    """
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        :return: cumulative bucket counts, sum and count
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total_count = self._count
+
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            running += bucket_count
+            cumulative[format_bound(bound)] = running
+        cumulative["+Inf"] = total_count
+        return {"buckets": cumulative, "sum": total_sum, "count": total_count}
+
+
+def format_bound(bound: float) -> str:
+    return str(int(bound)) if float(bound).is_integer() else repr(bound)
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_histogram(name: str, labels: Dict[str, str], snapshot: Dict[str, Any]) -> List[str]:
+    """
+    Histogram snapshot as Prometheus text exposition lines
+    :param name: metric name
+    :param labels: labels of this series
+    :param snapshot: Histogram.snapshot()
+    :return: _bucket, _sum and _count lines
+    """
+    label_text = ",".join(f'{key}="{_label_value(value)}"' for key, value in labels.items())
+    separator = "," if label_text else ""
+    lines = [
+        f'{name}_bucket{{{label_text}{separator}le="{bound}"}} {count}'
+        for bound, count in snapshot["buckets"].items()
+    ]
+    lines.append(f"{name}_sum{{{label_text}}} {snapshot['sum']}")
+    lines.append(f"{name}_count{{{label_text}}} {snapshot['count']}")
+    return lines
+
+
+# Seconds, for request and database time
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# Statements per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestMetrics:
+    """
+    Per-endpoint histograms of request duration, database statements and
+    database time. Endpoints are route templates ("/api/v1/tracks/{track_id}"),
+    so the number of series stays bounded.
+    """
+
+    METRICS = (
+        ("http_request_duration_seconds", "Request duration", LATENCY_BUCKETS),
+        ("db_statements_per_request", "SQL statements executed per request", STATEMENT_BUCKETS),
+        ("db_time_seconds_per_request", "Time spent in SQL statements per request", LATENCY_BUCKETS),
+    )
+
+    def __init__(self) -> None:
+        self._series: Dict[Tuple[str, str], Tuple[Histogram, ...]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, method: str, endpoint: str, duration: float, statements: int, db_seconds: float) -> None:
+        key = (method, endpoint)
+        histograms = self._series.get(key)
+        if histograms is None:
+            with self._lock:
+                histograms = self._series.setdefault(
+                    key, tuple(Histogram(buckets) for _, _, buckets in self.METRICS)
+                )
+        for histogram, value in zip(histograms, (duration, statements, db_seconds)):
+            histogram.observe(value)
+
+    def prometheus(self) -> str:
+        """All series in the Prometheus text format"""
+        with self._lock:
+            series = sorted(self._series.items())
+        lines = []
+        for index, (name, help_text, _) in enumerate(self.METRICS):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, endpoint), histograms in series:
+                lines.extend(prometheus_histogram(
+                    name, {"method": method, "endpoint": endpoint}, histograms[index].snapshot()
+                ))
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,138 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import request_metrics
+from app.db.query_stats import QueryStats, current_query_stats
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies above max_bytes.
+    A declared Content-Length is checked before anything is read; chunked
+    bodies are counted while they stream in, so an oversized upload is cut
+    off early instead of being spooled to disk first.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int) -> None:
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_bytes:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    if response_started:
+                        raise RequestTooLarge()
+                    # Answer here rather than raise: the body is read inside
+                    # FastAPI's form parsing, which turns any exception into
+                    # a 400. The app sees a client that went away instead.
+                    rejected = True
+                    await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if rejected:
+                # The 413 is already out
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except Exception:
+            if not rejected:
+                raise
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=413,
+            content={"detail": "Request body too large"},
+        )
+        await response(scope, receive, send)
+
+
+def endpoint_label(scope: Scope) -> str:
+    """Route template of a handled request, the mount path for mounted apps"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("endpoint") is not None:
+        return scope.get("root_path") or "/"
+    return "unmatched"
+
+
+class QueryStatsMiddleware:
+    """
+    Count the SQL statements and database time of every request.
+    Results go to request_metrics per route template; with debug_headers
+    they are also returned as X-DB-* response headers.
+    """
+
+    def __init__(self, app: ASGIApp, debug_headers: bool = False) -> None:
+        self.app = app
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.debug_headers:
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Statements"] = str(stats.statements)
+                headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+                headers["X-DB-Slowest-Ms"] = f"{stats.slowest_seconds * 1000:.2f}"
+                if stats.slowest_statement:
+                    headers["X-DB-Slowest-Statement"] = " ".join(stats.slowest_statement.split())[:200]
+                endpoint = scope.get("endpoint")
+                if endpoint is not None:
+                    name = getattr(endpoint, "__name__", type(endpoint).__name__)
+                    headers["X-Endpoint"] = f"{endpoint.__module__}.{name}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            current_query_stats.reset(token)
+            request_metrics.observe(
+                scope["method"],
+                endpoint_label(scope),
+                time.perf_counter() - started,
+                stats.statements,
+                stats.seconds,
+            )
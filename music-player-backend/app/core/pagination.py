@@ -0,0 +1,259 @@
+import base64
+import enum
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.orm import Query
+
+from app.config import settings
+
+
+class CountMode(str, enum.Enum):
+    # Separate COUNT(*) query, exact total
+    EXACT = "exact"
+    # No total at all, has_more is computed from one extra row
+    NONE = "none"
+    # Planner estimate on PostgreSQL, short-lived cached count elsewhere
+    ESTIMATE = "estimate"
+    # COUNT(*) OVER () in the page query itself, one round trip
+    WINDOW = "window"
+
+
+_count_cache: Dict[Tuple[str, str], Tuple[float, int]] = {}
+_count_cache_lock = threading.Lock()
+_COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def _sign(payload: bytes) -> str:
+    digest = hmac.new(settings.SECRET_KEY.encode(), payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:12]).decode().rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def encode_cursor(scope: str, data: Dict[str, Any]) -> str:
+    """
+    Encode an opaque cursor
+    :param scope: list the cursor belongs to, so it can't be replayed elsewhere
+    :param data: cursor position (keyset values or offset)
+    :return: signed url-safe string
+    """
+    payload = json.dumps({"s": scope, **data}, separators=(",", ":")).encode()
+    body = base64.urlsafe_b64encode(payload).decode().rstrip("=")
+    return f"{body}.{_sign(payload)}"
+
+
+def decode_cursor(scope: str, cursor: str) -> Dict[str, Any]:
+    """
+    Decode and verify a cursor produced by encode_cursor
+    :param scope: expected list scope
+    :param cursor: cursor string from the client
+    :return: cursor position
+    """
+    try:
+        body, signature = cursor.split(".", 1)
+        payload = _b64decode(body)
+        if not hmac.compare_digest(signature, _sign(payload)):
+            raise ValueError("bad signature")
+        data = json.loads(payload)
+        if data.pop("s", None) != scope:
+            raise ValueError("cursor scope mismatch")
+        return data
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _after(keys: Sequence, values: List[Any]):
+    if len(keys) == 1:
+        return keys[0] > values[0]
+    return tuple_(*keys) > tuple_(*values)
+
+
+def _statement_key(query: Query) -> str:
+    dialect = query.session.get_bind().dialect
+    return str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN of a statement, compiled with its bound parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement) -> None:
+        self.statement = statement
+
+
+_EXPLAIN_PREFIX = "EXPLAIN (FORMAT JSON) "
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element: _Explain, compiler, **kw) -> str:
+    return _EXPLAIN_PREFIX + compiler.process(element.statement, **kw)
+
+
+def _planner_estimate(query: Query) -> Optional[int]:
+    # A failed statement aborts the whole PostgreSQL transaction, the
+    # savepoint keeps it usable for the exact count fallback
+    try:
+        with query.session.begin_nested():
+            plan = query.session.execute(_Explain(query.statement)).scalar()
+    except SQLAlchemyError:
+        return None
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(query: Query, scope: str) -> int:
+    """
+    Approximate row count for a list query.
+    PostgreSQL answers from planner statistics without scanning; other
+    databases run an exact count. Either way the result is cached for
+    COUNT_CACHE_TTL_SECONDS, keyed on the rendered statement.
+    :param query: filtered query
+    :param scope: list name
+    :return: estimated number of rows
+    """
+    try:
+        sql = _statement_key(query)
+    except Exception:
+        # Some bound values can't be rendered as literals, skip the cache
+        return query.count()
+
+    key = (scope, sql)
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = None
+    if query.session.get_bind().dialect.name == "postgresql":
+        total = _planner_estimate(query)
+    if total is None:
+        total = query.count()
+
+    with _count_cache_lock:
+        if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+        _count_cache[key] = (now + settings.COUNT_CACHE_TTL_SECONDS, total)
+    return total
+
+
+def paginate(
+    query: Query,
+    *,
+    scope: str,
+    page: int,
+    size: int,
+    cursor: Optional[str] = None,
+    keys: Optional[Sequence] = None,
+    ordered: bool = False,
+    count: CountMode = CountMode.EXACT,
+) -> Dict[str, Any]:
+    """
+    Paginate a list query.
+
+    Without a cursor the classic page/size contract is used. With a cursor
+    the next page is fetched by seeking past the last returned sort key
+    (keyset pagination), so deep pages cost the same as the first one and
+    concurrent inserts don't shift rows between pages. When the query has
+    its own ordering (e.g. search relevance) pass ordered=True and the
+    cursor carries an offset instead.
+
+    The count mode picks how total/pages are produced, see CountMode.
+    has_more is always exact because one extra row is fetched. A window
+    count after a keyset cursor would only see the remaining rows, so in
+    that case total is omitted.
+
+    :param query: filtered query
+    :param scope: list name the cursors are bound to
+    :param page: page number for page mode
+    :param size: page size
+    :param cursor: cursor returned as next_cursor by the previous call
+    :param keys: unique ascending sort key columns, defaults to the entity id
+    :param ordered: query is already ordered, keep its ordering
+    :param count: how to compute total
+    :return: dict matching the *List schemas
+    """
+    if ordered:
+        keys = ()
+    elif not keys:
+        keys = (query.column_descriptions[0]["entity"].id,)
+
+    total = None
+    if count == CountMode.EXACT:
+        total = query.count()
+    elif count == CountMode.ESTIMATE:
+        total = estimate_count(query, scope)
+
+    if keys:
+        query = query.order_by(*keys)
+
+    offset = (page - 1) * size
+    if cursor is not None:
+        position = decode_cursor(scope, cursor)
+        if keys:
+            values = position.get("k")
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+            query = query.filter(_after(keys, values))
+            offset = 0
+        else:
+            offset = position.get("o")
+            if not isinstance(offset, int) or offset < 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid cursor"
+                )
+
+    window = count == CountMode.WINDOW and not (cursor is not None and keys)
+    if window:
+        rows = query.add_columns(func.count().over()).offset(offset).limit(size + 1).all()
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0][-1]
+        elif offset:
+            # Past the end the window has nothing to report on
+            total = query.order_by(None).count()
+        else:
+            total = 0
+    else:
+        items = query.offset(offset).limit(size + 1).all()
+
+    has_more = len(items) > size
+    items = items[:size]
+
+    next_cursor = None
+    if has_more:
+        if keys:
+            last = items[-1]
+            next_cursor = encode_cursor(scope, {"k": [getattr(last, key.key) for key in keys]})
+        else:
+            next_cursor = encode_cursor(scope, {"o": offset + size})
+
+    return {
+        "items": items,
+        "total": total,
+        "page": page if cursor is None else None,
+        "size": size,
+        "pages": None if total is None else (total + size - 1) // size,
+        "has_more": has_more,
+        "next_cursor": next_cursor,
+    }
@@ -0,0 +1,209 @@
+import hashlib
+import itertools
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+from app.core.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+
+class ResponseCacheBackend(ABC):
+    """
+    Where rendered responses are kept.
+
+    Invalidation is by namespace generation: every key embeds the current
+    generation of its namespace, and invalidating bumps it, so old entries
+    are never read again and just expire. A shared backend (e.g. Redis with
+    GET/SETEX and INCR) only has to implement these four methods.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[CachedResponse]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: CachedResponse) -> None:
+        ...
+
+    @abstractmethod
+    def generation(self, namespace: str) -> int:
+        ...
+
+    @abstractmethod
+    def bump(self, namespace: str) -> None:
+        ...
+
+
+class LocalResponseCacheBackend(ResponseCacheBackend):
+    """
+    Per-process LRU with TTL. With several workers an invalidation only
+    reaches the worker that handled the write, the others serve the old
+    response for at most ttl seconds.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self.ttl = ttl
+        self._entries: TTLCache[CachedResponse] = TTLCache(maxsize=maxsize, ttl=ttl)
+        # namespace -> (generation, bumped at); generations come from one
+        # counter so a purged namespace never gets an old number back
+        self._generations: Dict[str, Tuple[int, float]] = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: CachedResponse) -> None:
+        self._entries.set(key, value)
+
+    def generation(self, namespace: str) -> int:
+        entry = self._generations.get(namespace)
+        return entry[0] if entry else 0
+
+    def bump(self, namespace: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_purge:
+                # Entries of a namespace bumped more than ttl ago are gone,
+                # its generation no longer needs to be remembered
+                self._next_purge = now + 60
+                self._generations = {
+                    ns: entry for ns, entry in self._generations.items()
+                    if entry[1] + self.ttl > now
+                }
+            self._generations[namespace] = (next(self._counter), now)
+
+
+class ResponseCache:
+    """Rendered JSON responses by namespace and normalized query params"""
+
+    def __init__(self, backend: ResponseCacheBackend) -> None:
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def key(self, namespace: str, params: Mapping[str, Any]) -> str:
+        """
+        Cache key for a namespace and the parsed request parameters.
+        Parameters left unset are dropped and the rest sorted, so
+        ?page=1&size=20 and ?size=20 share an entry.
+        """
+        normalized = []
+        for name, value in params.items():
+            if isinstance(value, Enum):
+                value = value.value
+            if isinstance(value, str):
+                value = value.strip()
+            if value is None or value == "":
+                continue
+            normalized.append((name, str(value)))
+        normalized.sort()
+        return f"{namespace}@{self.backend.generation(namespace)}?{urlencode(normalized)}"
+
+    def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+        self.invalidations += 1
+
+    async def respond(
+        self,
+        request: Request,
+        namespace: str,
+        params: Mapping[str, Any],
+        build: Callable[[], Awaitable[Any]],
+    ) -> Response:
+        """
+        Serve a cached response, or build, render and store it.
+        The key is taken before build runs: a write that invalidates the
+        namespace meanwhile makes the result unreachable instead of stale.
+        :param request: current request, for If-None-Match
+        :param namespace: invalidation scope of the response
+        :param params: parameters the response depends on
+        :param build: coroutine producing the response content
+        :return: 200 with an ETag, or 304 if the client's copy is current
+        """
+        key = self.key(namespace, params)
+        cached = self.backend.get(key)
+        if cached is None:
+            self.misses += 1
+            cached = render(await build())
+            self.backend.set(key, cached)
+        else:
+            self.hits += 1
+        response = conditional_response(request, cached)
+        if response.status_code == 304:
+            self.not_modified += 1
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+        }
+
+
+def render(content: Any) -> CachedResponse:
+    """Serialize content the way JSONResponse would and tag it"""
+    body = JSONResponse(content=jsonable_encoder(content)).body
+    return CachedResponse(body=body, etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+
+
+def conditional_response(
+    request: Request, cached: CachedResponse, cache_control: str = "public, no-cache"
+) -> Response:
+    """
+    200 with the cached body, or 304 when If-None-Match has its ETag
+    :param cache_control: default makes clients and proxies revalidate
+        with If-None-Match every time
+    """
+    headers = {"ETag": cached.etag, "Cache-Control": cache_control, "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+response_cache = ResponseCache(
+    LocalResponseCacheBackend(
+        maxsize=settings.RESPONSE_CACHE_MAX_ENTRIES, ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+    )
+)
+
+
+def set_response_cache_backend(backend: ResponseCacheBackend) -> None:
+    """Replace the response cache backend, call once at startup"""
+    response_cache.backend = backend
@@ -0,0 +1,103 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict
+
+
+class RevocationStore(ABC):
+    """
+    Where revoked tokens are remembered.
+
+    Two kinds of entries: single tokens by jti (logout, refresh rotation)
+    and whole users (every token issued before a point in time, e.g. after
+    a password change or deletion). Entries only need to live as long as
+    the tokens they cancel. Subclass this to share revocations between
+    workers, e.g. through Redis.
+    """
+
+    @abstractmethod
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def revoke_if_active(self, jti: str, expires_at: float) -> bool:
+        """
+        Revoke a token unless it already is, as one atomic step (SET NX in
+        Redis). Refresh rotation relies on it: of two concurrent refreshes
+        with the same token only one may win.
+        :return: True if this call revoked it
+        """
+
+    @abstractmethod
+    def is_token_revoked(self, jti: str) -> bool:
+        ...
+
+    @abstractmethod
+    def revoke_user(self, user_id: int, issued_before: float, expires_at: float) -> None:
+        ...
+
+    @abstractmethod
+    def is_user_revoked(self, user_id: int, issued_at: float) -> bool:
+        ...
+
+
+class InMemoryRevocationStore(RevocationStore):
+    """Per-process store, enough for a single worker or short access tokens"""
+
+    def __init__(self) -> None:
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def _purge(self, now: float) -> None:
+        # Called with the lock held, at most once a minute
+        if now < self._next_purge:
+            return
+        self._next_purge = now + 60
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        self._users = {uid: entry for uid, entry in self._users.items() if entry[1] > now}
+
+    def revoke_token(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._purge(time.time())
+            self._tokens[jti] = expires_at
+
+    def revoke_if_active(self, jti: str, expires_at: float) -> bool:
+        with self._lock:
+            self._purge(time.time())
+            if jti in self._tokens:
+                return False
+            self._tokens[jti] = expires_at
+            return True
+
+    def is_token_revoked(self, jti: str) -> bool:
+        with self._lock:
+            return jti in self._tokens
+
+    def revoke_user(self, user_id: int, issued_before: float, expires_at: float) -> None:
+        with self._lock:
+            self._purge(time.time())
+            previous = self._users.get(user_id)
+            if previous:
+                issued_before = max(issued_before, previous[0])
+                expires_at = max(expires_at, previous[1])
+            self._users[user_id] = (issued_before, expires_at)
+
+    def is_user_revoked(self, user_id: int, issued_at: float) -> bool:
+        with self._lock:
+            entry = self._users.get(user_id)
+        return entry is not None and issued_at < entry[0]
+
+
+revocation_store: RevocationStore = InMemoryRevocationStore()
+
+
+def set_revocation_store(store: RevocationStore) -> None:
+    """Replace the revocation backend, call once at startup"""
+    global revocation_store
+    revocation_store = store
+
+
+def get_revocation_store() -> RevocationStore:
+    return revocation_store
@@ -1,32 +1,201 @@
+import asyncio
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
+from fastapi import HTTPException, status
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.config import settings
+from app.core.metrics import Histogram
+from app.core.revocation import get_revocation_store
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+# min_rounds makes hashes with a lower cost "outdated", so raising
+# BCRYPT_ROUNDS upgrades existing hashes on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+)
+
+# Seconds, bcrypt at cost 12 takes ~0.25s on a typical core
+PASSWORD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class PasswordHasher:
+    """
+    Bounded pool for bcrypt work.
+
+    bcrypt releases the GIL, so a small thread pool keeps it off the request
+    threadpool and the event loop. At most PASSWORD_HASH_WORKERS run at a
+    time and PASSWORD_HASH_MAX_QUEUE more may wait; beyond that requests are
+    rejected with 503 instead of piling up behind each other.
+    """
+
+    def __init__(self, workers: int, max_queue: int) -> None:
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = Histogram(PASSWORD_BUCKETS)
+        self.run_seconds = Histogram(PASSWORD_BUCKETS)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password"
+                )
+            return self._executor
+
+    def _call(self, submitted: float, fn: Callable, args: tuple) -> Any:
+        started = time.perf_counter()
+        self.wait_seconds.observe(started - submitted)
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            self.run_seconds.observe(time.perf_counter() - started)
+            with self._lock:
+                self.running -= 1
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many login attempts in progress, please retry",
+                headers={"Retry-After": "1"},
+            )
+        with self._lock:
+            self.pending += 1
+        try:
+            future = self._get_executor().submit(self._call, time.perf_counter(), fn, args)
+        except BaseException:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run on the pool from async code"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def run_sync(self, fn: Callable, *args: Any) -> Any:
+        """Run on the pool from a sync endpoint, blocking the calling thread"""
+        return self.submit(fn, *args).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = self.pending
+            running = self.running
+            completed = self.completed
+            rejected = self.rejected
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": running,
+            "queued": pending - running,
+            "completed": completed,
+            "rejected": rejected,
+            "wait_seconds": self.wait_seconds.snapshot(),
+            "run_seconds": self.run_seconds.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
 
 def create_access_token(
-    subject: Union[str, Any], expires_delta: Optional[timedelta] = None
+    subject: Union[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    role: Optional[str] = None,
+    is_active: Optional[bool] = None,
 ) -> str:
     """
-    Create JWT token
+    Create JWT token.
+    With role and is_active the token carries everything request auth
+    needs, so it is validated without touching the database.
     :param subject: token subject (usually user id)
     :param expires_delta: token expiration time
+    :param role: user role claim
+    :param is_active: user active flag claim
     :return: encoded JWT token
     """
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(
+        expire = now + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "iat": time.time(), "sub": str(subject), "type": ACCESS_TOKEN_TYPE}
+    if role is not None:
+        to_encode["role"] = str(getattr(role, "value", role))
+    if is_active is not None:
+        to_encode["active"] = is_active
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def create_refresh_token(subject: Union[str, Any]) -> str:
+    """
+    Create a long-lived refresh token, only accepted by /auth/refresh
+    :param subject: user id
+    :return: encoded JWT token with a unique jti for revocation
+    """
+    now = datetime.utcnow()
+    to_encode = {
+        "exp": now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        # Sub-second iat, so revoke_user_tokens cuts exactly at the call
+        "iat": time.time(),
+        "sub": str(subject),
+        "type": REFRESH_TOKEN_TYPE,
+        "jti": uuid.uuid4().hex,
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+def revoke_user_tokens(user_id: int) -> None:
+    """
+    Invalidate every access and refresh token issued to a user so far
+    :param user_id: user id
+    """
+    now = time.time()
+    get_revocation_store().revoke_user(
+        user_id,
+        issued_before=now,
+        expires_at=now + settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600,
+    )
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify password against hashed password
@@ -34,7 +203,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     :param hashed_password: hashed password
     :return: True if password match
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.run_sync(pwd_context.verify, plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """
@@ -42,4 +211,23 @@ def get_password_hash(password: str) -> str:
     :param password: plain password
     :return: hashed password
     """
-    return pwd_context.hash(password)
\ No newline at end of file
+    return password_hasher.run_sync(pwd_context.hash, password)
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify password on the password pool
+    :param plain_password: plain password
+    :param hashed_password: stored hash
+    :return: (match, new hash if the stored one is outdated and should be replaced)
+    """
+    return await password_hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Hash password on the password pool
+    :param password: plain password
+    :return: hashed password
+    """
+    return await password_hasher.run(pwd_context.hash, password)
@@ -0,0 +1,201 @@
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from typing import Mapping, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Receive, Scope, Send
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def make_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag from size and modification time"""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single byte range
+    :param header: value of the Range header
+    :param size: file size
+    :return: inclusive (start, end), None if the header should be ignored
+    :raises ValueError: if the range can't be satisfied
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        # Multipart ranges are not worth it for audio, send the whole file
+        return None
+    if size == 0:
+        # No byte of an empty file can be selected, and "bytes 0--1/0" is
+        # no valid Content-Range: send the (empty) file
+        return None
+
+    start, sep, end = spec.strip().partition("-")
+    try:
+        if start == "":
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                raise ValueError("range not satisfiable")
+            return max(size - length, 0), size - 1
+        first = int(start)
+        last = int(end) if end else size - 1
+    except ValueError:
+        if start == "" and end.isdigit():
+            raise
+        # Malformed ranges are ignored, not rejected
+        return None
+
+    if not sep or (end and last < first):
+        # An invalid range-spec is ignored, not rejected (RFC 9110 14.1.1)
+        return None
+    if first >= size:
+        raise ValueError("range not satisfiable")
+    return first, min(last, size - 1)
+
+
+class RangeFileResponse(Response):
+    """
+    File response with HTTP Range and conditional GET support.
+
+    The body is sent with the ASGI zero-copy extension (os.sendfile in the
+    server) when the server offers it, otherwise it is read in chunks with
+    os.pread in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        request_headers: Mapping[str, str],
+        method: str = "GET",
+        media_type: Optional[str] = None,
+        chunk_size: int = 256 * 1024,
+        stat_result: Optional[os.stat_result] = None,
+    ) -> None:
+        self.path = path
+        self.chunk_size = chunk_size
+        self.send_header_only = method.upper() == "HEAD"
+        self.background = None
+
+        if stat_result is None:
+            stat_result = os.stat(path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise FileNotFoundError(path)
+
+        size = stat_result.st_size
+        etag = make_etag(stat_result)
+        self.media_type = media_type or guess_type(path)[0] or "application/octet-stream"
+        self.init_headers({
+            "accept-ranges": "bytes",
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        })
+
+        self.status_code = 200
+        self.offset = 0
+        self.count = size
+
+        if self._not_modified(request_headers, etag, stat_result.st_mtime):
+            self.status_code = 304
+            self.count = 0
+            del self.headers["content-type"]
+            return
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and (if_range is None or if_range == etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except ValueError:
+                self.status_code = 416
+                self.count = 0
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                self.status_code = 206
+                self.offset = start
+                self.count = end - start + 1
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+        self.headers["content-length"] = str(self.count)
+
+    @staticmethod
+    def _not_modified(request_headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if self.send_header_only or self.count == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": ZEROCOPY_EXTENSION,
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                    "more_body": False,
+                })
+            return
+
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            position = self.offset
+            remaining = self.count
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(
+                    os.pread, fd, min(self.chunk_size, remaining), position
+                )
+                if not chunk:
+                    break
+                position += len(chunk)
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+            if remaining > 0:
+                # File shrank while streaming, close the body anyway
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            os.close(fd)
+
+
+class MediaStaticFiles(StaticFiles):
+    """
+    Static files for MEDIA_ROOT.
+    Media names are derived from the content hash, so a URL always serves
+    the same bytes and clients may cache it forever.
+    """
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,33 @@
+import os
+from typing import Set, Tuple
+
+from sqlalchemy.engine import Engine
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def alembic_config():
+    """Alembic config of the project, usable from any working directory"""
+    # Alembic is only needed here, keep it out of the import path of workers
+    from alembic.config import Config
+
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "alembic"))
+    return config
+
+
+def schema_revisions(engine: Engine) -> Tuple[Set[str], Set[str]]:
+    """
+    Compare the database schema with the migrations shipped with the code.
+    Reads alembic_version only, nothing is reflected or created.
+    :param engine: database engine
+    :return: (revisions applied to the database, head revisions in alembic/versions)
+    """
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    heads = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+
+    with engine.connect() as connection:
+        current = set(MigrationContext.configure(connection).get_current_heads())
+    return current, heads
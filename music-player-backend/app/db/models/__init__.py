@@ -4,3 +4,5 @@ from app.db.models.playlist import Playlist, PlaylistTrack
 from app.db.models.favorite import Favorite
 from app.db.models.dislike import Dislike
 from app.db.models.review import Review
+from app.db.models.media_blob import MediaBlob
+from app.db.models.genre_stat import GenreStat
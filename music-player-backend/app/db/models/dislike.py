@@ -1,7 +1,8 @@
-from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, Index, Integer, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, BaseModel
+from app.db.models.track import bump_track_counter
 
 class Dislike(Base, BaseModel):
 
@@ -10,7 +11,20 @@ class Dislike(Base, BaseModel):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
 
-    __table_args__ = (UniqueConstraint('user_id', 'track_id', name='_user_track_dislike_uc'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'track_id', name='_user_track_dislike_uc'),
+        Index('ix_dislikes_user_id_id', 'user_id', 'id'),
+    )
 
     user = relationship("User", back_populates="dislikes")
-    track = relationship("Track", back_populates="dislikes")
\ No newline at end of file
+    track = relationship("Track", back_populates="dislikes")
+
+
+@event.listens_for(Dislike, "after_insert")
+def _dislike_inserted(mapper, connection, target):
+    bump_track_counter(connection, target.track_id, "dislikes_count", 1)
+
+
+@event.listens_for(Dislike, "after_delete")
+def _dislike_deleted(mapper, connection, target):
+    bump_track_counter(connection, target.track_id, "dislikes_count", -1)
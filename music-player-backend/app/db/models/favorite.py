@@ -1,7 +1,8 @@
-from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, Index, Integer, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, BaseModel
+from app.db.models.track import bump_track_counter
 
 class Favorite(Base, BaseModel):
 
@@ -10,7 +11,21 @@ class Favorite(Base, BaseModel):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
 
-    __table_args__ = (UniqueConstraint('user_id', 'track_id', name='_user_track_favorite_uc'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'track_id', name='_user_track_favorite_uc'),
+        # GET /favorites: filter by user, keyset by id
+        Index('ix_favorites_user_id_id', 'user_id', 'id'),
+    )
 
     user = relationship("User", back_populates="favorites")
-    track = relationship("Track", back_populates="favorites")
\ No newline at end of file
+    track = relationship("Track", back_populates="favorites")
+
+
+@event.listens_for(Favorite, "after_insert")
+def _favorite_inserted(mapper, connection, target):
+    bump_track_counter(connection, target.track_id, "favorites_count", 1)
+
+
+@event.listens_for(Favorite, "after_delete")
+def _favorite_deleted(mapper, connection, target):
+    bump_track_counter(connection, target.track_id, "favorites_count", -1)
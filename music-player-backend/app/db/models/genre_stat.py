@@ -0,0 +1,56 @@
+from sqlalchemy import Column, Enum, Integer, event, func, inspect, select
+
+from app.db.base import Base, BaseModel
+from app.db.models.track import Genre, Track
+from app.db.upsert import insert_on_conflict
+
+
+class GenreStat(Base, BaseModel):
+    """
+    Number of tracks per genre, kept in sync by the Track mapper events
+    inside the same transaction as the track change, like the counters on
+    tracks, so /genres/counts never has to count the tracks table.
+    """
+    __tablename__ = "genre_stats"
+
+    genre = Column(Enum(Genre), nullable=False, unique=True)
+    tracks_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+def bump_genre_count(connection, genre: Genre, delta: int) -> None:
+    """Atomically add delta to a genre's track count, creating its row on first use"""
+    table = GenreStat.__table__
+    statement = insert_on_conflict(connection, table).values(genre=genre, tracks_count=max(delta, 0))
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.genre],
+        set_={"tracks_count": table.c.tracks_count + delta, "updated_at": func.now()},
+    ))
+
+
+def genre_counts(db) -> dict:
+    """
+    :param db: database session
+    :return: {genre value: track count} for every genre, zero if it has none
+    """
+    counts = {genre.value: 0 for genre in Genre}
+    for genre, tracks_count in db.execute(select(GenreStat.genre, GenreStat.tracks_count)):
+        counts[genre.value] = tracks_count
+    return counts
+
+
+@event.listens_for(Track, "after_insert")
+def _track_inserted(mapper, connection, target):
+    bump_genre_count(connection, target.genre, 1)
+
+
+@event.listens_for(Track, "after_update")
+def _track_updated(mapper, connection, target):
+    history = inspect(target).attrs.genre.history
+    if history.deleted and history.added:
+        bump_genre_count(connection, history.deleted[0], -1)
+        bump_genre_count(connection, history.added[0], 1)
+
+
+@event.listens_for(Track, "after_delete")
+def _track_deleted(mapper, connection, target):
+    bump_genre_count(connection, target.genre, -1)
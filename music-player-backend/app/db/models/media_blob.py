@@ -0,0 +1,85 @@
+from sqlalchemy import Column, Integer, String, delete, event, func, select, update
+from sqlalchemy.orm import object_session
+
+from app.db.base import Base, BaseModel
+from app.db.models.track import Track
+from app.db.upsert import insert_on_conflict
+
+# Session.info key with blob paths whose last reference went away in the
+# current transaction, the files are removed once it commits
+RECLAIM_KEY = "reclaim_media"
+
+
+class MediaBlob(Base, BaseModel):
+    """
+    Reference count of a content-addressed media file.
+    path is relative to MEDIA_ROOT and already contains the SHA-256, so
+    identical uploads share one row and one file.
+    """
+    __tablename__ = "media_blobs"
+
+    path = Column(String, nullable=False, unique=True, index=True)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+def media_blob_path(url: str) -> str:
+    """Media URL (/media/...) -> path relative to MEDIA_ROOT"""
+    return url[len("/media/"):] if url.startswith("/media/") else url.lstrip("/")
+
+
+def acquire_blob(connection, path: str) -> None:
+    """Add a reference to a blob, creating its row on first use"""
+    table = MediaBlob.__table__
+    statement = insert_on_conflict(connection, table).values(path=path, ref_count=1)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.path],
+        set_={"ref_count": table.c.ref_count + 1, "updated_at": func.now()},
+    ))
+
+
+def release_blob(connection, path: str) -> bool:
+    """
+    Drop a reference to a blob. The row stays at zero, reclaim_blob
+    deletes it together with the file once the transaction has committed.
+    :return: True if it was the last one
+    """
+    table = MediaBlob.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.path == path)
+        .values(ref_count=table.c.ref_count - 1)
+    )
+    remaining = connection.execute(
+        select(table.c.ref_count).where(table.c.path == path)
+    ).scalar()
+    return remaining is not None and remaining <= 0
+
+
+def reclaim_blob(connection, path: str) -> bool:
+    """
+    Delete the row of a blob nobody references anymore.
+    The file has to be removed before the transaction commits: the deleted
+    row stays locked until then, so an upload acquiring the same path
+    waits and finds the file gone rather than having it removed under it.
+    :return: True if the row was deleted and the file has to go
+    """
+    table = MediaBlob.__table__
+    result = connection.execute(
+        delete(table).where(table.c.path == path, table.c.ref_count <= 0)
+    )
+    return result.rowcount > 0
+
+
+@event.listens_for(Track, "after_insert")
+def _track_inserted(mapper, connection, target):
+    for url in (target.cover_path, target.audio_path):
+        acquire_blob(connection, media_blob_path(url))
+
+
+@event.listens_for(Track, "after_delete")
+def _track_deleted(mapper, connection, target):
+    session = object_session(target)
+    for url in (target.cover_path, target.audio_path):
+        path = media_blob_path(url)
+        if release_blob(connection, path) and session is not None:
+            session.info.setdefault(RECLAIM_KEY, set()).add(path)
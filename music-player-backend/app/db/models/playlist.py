@@ -1,8 +1,13 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, Integer
+from sqlalchemy import Column, String, Boolean, ForeignKey, Index, Integer, text
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, BaseModel
 
+# Distance between neighbouring playlist_tracks.position values after
+# a rebalance
+POSITION_GAP = 1024
+
+
 class Playlist(Base, BaseModel):
 
     __tablename__ = "playlists"
@@ -13,6 +18,12 @@ class Playlist(Base, BaseModel):
     cover_path = Column(String, nullable=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    __table_args__ = (
+        Index('ix_playlists_user_id_is_public', 'user_id', 'is_public'),
+        # Public branch of "user_id = :id OR is_public" in GET /playlists
+        Index('ix_playlists_public_id', 'id', postgresql_where=text('is_public'), sqlite_where=text('is_public')),
+    )
+
     user = relationship("User", back_populates="playlists")
     tracks = relationship("PlaylistTrack", back_populates="playlist", cascade="all, delete-orphan")
 
@@ -23,7 +34,12 @@ class PlaylistTrack(Base, BaseModel):
 
     playlist_id = Column(Integer, ForeignKey("playlists.id"), nullable=False)
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
-    position = Column(Integer, nullable=False)  # Track order in playlist
+    # Sort key, not the 1-based position clients see: rows are spaced
+    # POSITION_GAP apart so an insert or move takes a key between its
+    # neighbours and touches one row
+    position = Column(Integer, nullable=False)
+
+    __table_args__ = (Index('ix_playlist_tracks_playlist_id_position', 'playlist_id', 'position'),)
 
     playlist = relationship("Playlist", back_populates="tracks")
     track = relationship("Track", back_populates="playlists")
\ No newline at end of file
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, Text, UniqueConstraint, event
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, BaseModel
+from app.db.models.track import bump_track_counter
 
 class Review(Base, BaseModel):
 
@@ -11,7 +12,21 @@ class Review(Base, BaseModel):
     track_id = Column(Integer, ForeignKey("tracks.id"), nullable=False)
     text = Column(Text, nullable=False)
 
-    __table_args__ = (UniqueConstraint('user_id', 'track_id', name='_user_track_review_uc'),)
+    __table_args__ = (
+        UniqueConstraint('user_id', 'track_id', name='_user_track_review_uc'),
+        # ?track_id= lists; ?user_id= is served by the unique constraint
+        Index('ix_reviews_track_id_id', 'track_id', 'id'),
+    )
 
     user = relationship("User", back_populates="reviews")
-    track = relationship("Track", back_populates="reviews")
\ No newline at end of file
+    track = relationship("Track", back_populates="reviews")
+
+
+@event.listens_for(Review, "after_insert")
+def _review_inserted(mapper, connection, target):
+    bump_track_counter(connection, target.track_id, "reviews_count", 1)
+
+
+@event.listens_for(Review, "after_delete")
+def _review_deleted(mapper, connection, target):
+    bump_track_counter(connection, target.track_id, "reviews_count", -1)
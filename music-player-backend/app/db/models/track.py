@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Enum
+from sqlalchemy import Column, String, Float, Enum, Index, Integer, BigInteger, JSON, update
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base, BaseModel
@@ -17,26 +17,47 @@ class Genre(str, enum.Enum):
         """Convert string to Genre enum"""
         if string_value is None:
             return None
-        
-        # Попытка прямого совпадения
-        for genre in cls:
-            if genre.value == string_value:
-                return genre
-        
-        # Попытка совпадения без учета регистра
-        lower_value = string_value.lower()
-        for genre in cls:
-            if genre.value.lower() == lower_value:
-                return genre
-                
+
+        # Попытка прямого совпадения, затем без учета регистра и разделителей
+        genre = GENRE_LOOKUP.get(string_value)
+        if genre is not None:
+            return genre
+        folded = fold_genre(string_value)
+        genre = GENRE_FOLDED_LOOKUP.get(folded)
+        if genre is not None:
+            return genre
+
         # Попытка совпадения части строки
-        for genre in cls:
-            if lower_value in genre.value.lower() or genre.value.lower() in lower_value:
-                return genre
-                
+        if folded:
+            for value, genre in GENRE_FOLDED_VALUES:
+                if folded in value or value in folded:
+                    return genre
+
         # Если не найдено совпадений, вывести информацию о допустимых значениях
-        valid_values = [g.value for g in cls]
-        raise ValueError(f"Неизвестный жанр: {string_value}. Допустимые значения: {', '.join(valid_values)}")
+        raise ValueError(f"Неизвестный жанр: {string_value}. Допустимые значения: {GENRE_VALUES_TEXT}")
+
+
+def fold_genre(value: str) -> str:
+    """Case-folded, without separators: "Hip Hop" and "hip-hop" are both hiphop"""
+    return "".join(char for char in value.casefold() if char.isalnum())
+
+
+# Lookup tables for Genre.from_string, built once instead of scanning the
+# enum on every filtered query
+GENRE_ALIASES = {
+    "rap": Genre.HIPHOP,
+    "chill": Genre.LOFI,
+    "lowfi": Genre.LOFI,
+    "alternative": Genre.INDIE,
+}
+GENRE_LOOKUP = {genre.value: genre for genre in Genre}
+GENRE_FOLDED_LOOKUP = {
+    **GENRE_ALIASES,
+    **{fold_genre(genre.name): genre for genre in Genre},
+    **{fold_genre(genre.value): genre for genre in Genre},
+}
+GENRE_FOLDED_VALUES = [(fold_genre(genre.value), genre) for genre in Genre]
+GENRE_VALUES_TEXT = ", ".join(genre.value for genre in Genre)
 
 class Track(Base, BaseModel):
     __tablename__ = "tracks"
@@ -47,8 +68,35 @@ class Track(Base, BaseModel):
     duration = Column(Float, nullable=False)
     cover_path = Column(String, nullable=False)
     audio_path = Column(String, nullable=False)
+    # {"64": "/media/covers/thumbs/..._64.webp", ...}, filled in the background
+    cover_thumbnails = Column(JSON, nullable=True)
+
+    # Filled from the audio headers at upload time
+    codec = Column(String, nullable=True)
+    bitrate = Column(Integer, nullable=True)  # kbps
+    sample_rate = Column(Integer, nullable=True)
+    channels = Column(Integer, nullable=True)
+    file_size = Column(BigInteger, nullable=True)  # bytes
+
+    # Denormalized counters, kept in sync by the Favorite/Dislike/Review
+    # mapper events inside the same transaction as the row change
+    favorites_count = Column(Integer, nullable=False, default=0, server_default="0")
+    dislikes_count = Column(Integer, nullable=False, default=0, server_default="0")
+    reviews_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (Index('ix_tracks_genre_id', 'genre', 'id'),)
 
     playlists = relationship("PlaylistTrack", back_populates="track")
     favorites = relationship("Favorite", back_populates="track", cascade="all, delete-orphan")
     dislikes = relationship("Dislike", back_populates="track", cascade="all, delete-orphan")
-    reviews = relationship("Review", back_populates="track", cascade="all, delete-orphan")
\ No newline at end of file
+    reviews = relationship("Review", back_populates="track", cascade="all, delete-orphan")
+
+
+def bump_track_counter(connection, track_id: int, counter: str, delta: int) -> None:
+    """Atomically add delta to one of the track counters"""
+    column = Track.__table__.c[counter]
+    connection.execute(
+        update(Track.__table__)
+        .where(Track.__table__.c.id == track_id)
+        .values({column: column + delta})
+    )
@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+from app.core.metrics import Histogram
+
+# Seconds spent waiting for a connection
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+# Connections in use, sampled at every checkout
+CHECKED_OUT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class PoolMetrics:
+    """Counters and histograms for one connection pool"""
+
+    def __init__(self) -> None:
+        self.wait_seconds = Histogram(WAIT_BUCKETS)
+        self.checked_out = Histogram(CHECKED_OUT_BUCKETS)
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+
+class _TimedCheckoutMixin:
+    # _do_get is where QueuePool blocks when the pool is exhausted, timing
+    # it gives the real wait instead of just the checkout rate
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.increment("timeouts")
+            raise
+        finally:
+            self.metrics.wait_seconds.observe(time.perf_counter() - start)
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+_metrics: Dict[str, PoolMetrics] = {}
+_pools: Dict[str, Pool] = {}
+
+
+def instrument_pool(name: str, pool: Pool) -> None:
+    """
+    Attach metrics to an engine pool
+    :param name: label in the metrics output
+    :param pool: engine.pool
+    """
+    metrics = _metrics.setdefault(name, PoolMetrics())
+    _pools[name] = pool
+    if isinstance(pool, _TimedCheckoutMixin):
+        pool.metrics = metrics
+
+    @event.listens_for(pool, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        if isinstance(pool, QueuePool):
+            metrics.checked_out.observe(pool.checkedout())
+
+    @event.listens_for(pool, "connect")
+    def _connect(dbapi_connection, connection_record):
+        metrics.increment("connects")
+
+    @event.listens_for(pool, "invalidate")
+    def _invalidate(dbapi_connection, connection_record, exception):
+        metrics.increment("invalidations")
+
+
+def pool_status() -> Dict[str, Any]:
+    """
+    Live state and histograms of every instrumented pool
+    """
+    result = {}
+    for name, pool in _pools.items():
+        metrics = _metrics[name]
+        entry: Dict[str, Any] = {"class": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "timeout": pool.timeout(),
+            })
+        entry.update({
+            "connects": metrics.connects,
+            "invalidations": metrics.invalidations,
+            "timeouts": metrics.timeouts,
+            "wait_seconds": metrics.wait_seconds.snapshot(),
+            "checked_out_histogram": metrics.checked_out.snapshot(),
+        })
+        result[name] = entry
+    return result
@@ -1,15 +1,119 @@
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import settings
+from app.db.pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, instrument_pool
+from app.db.query_stats import instrument_engine
+
+T = TypeVar("T")
+
+
+def engine_options(url: str, is_async: bool = False) -> Dict[str, Any]:
+    """
+    Pool and connection options from settings
+    :param url: database URL
+    :param is_async: options for create_async_engine
+    :return: keyword arguments for create_engine
+    """
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite":
+        # SQLite pools are per-file and cheap, keep SQLAlchemy's defaults
+        return {}
 
-engine = create_engine(settings.DATABASE_URL)
+    options: Dict[str, Any] = {
+        "poolclass": InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(settings.DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
+
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_pool("sync", engine.pool)
+instrument_engine(engine)
+
+# Async engine for the read endpoints, only created when DB_ASYNC is on
+async_engine = None
+AsyncSessionLocal = None
+
+
+def async_database_url(url: str) -> str:
+    """Switch a sync database URL to its asyncio driver"""
+    drivers = {
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg",
+        "sqlite": "sqlite+aiosqlite",
+    }
+    scheme, sep, rest = url.partition("://")
+    return drivers.get(scheme, scheme) + sep + rest
+
+
+if settings.DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(_async_url, **engine_options(_async_url, is_async=True))
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+    instrument_pool("async", async_engine.pool)
+    instrument_engine(async_engine.sync_engine)
+
 
-def get_db():
+def get_db() -> Generator[Session, None, None]:
+    """Request-scoped session, the one dependency every sync endpoint uses"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+class DatabaseRunner:
+    """
+    Runs ORM code written against a sync Session from an async endpoint.
+
+    With DB_ASYNC the function runs on an AsyncSession through run_sync:
+    every statement is awaited on the event loop (asyncpg/aiosqlite), so a
+    waiting request holds no thread. Otherwise it runs in the threadpool on
+    a regular Session, same as a sync endpoint would.
+
+    The function must return plain data or schemas, not ORM objects whose
+    lazy attributes would be loaded after it returns.
+    """
+
+    def __init__(self, session: Session, async_session: Optional[Any] = None) -> None:
+        self.session = session
+        self.async_session = async_session
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self.async_session is not None:
+            return await self.async_session.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, self.session, *args, **kwargs)
+
+
+async def get_db_runner() -> AsyncGenerator[DatabaseRunner, None]:
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as async_session:
+            yield DatabaseRunner(async_session.sync_session, async_session)
+        return
+
+    db = SessionLocal()
+    try:
+        yield DatabaseRunner(db)
+    finally:
+        await run_in_threadpool(db.close)
@@ -0,0 +1,19 @@
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+
+_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def insert_on_conflict(connection, table: Table):
+    """
+    INSERT for the connection's dialect that supports on_conflict_do_update.
+    Counter rows created on first use go through it, so two concurrent
+    first writers don't collide on the unique key.
+    """
+    try:
+        return _INSERTS[connection.dialect.name](table)
+    except KeyError:
+        raise NotImplementedError(f"No upsert for {connection.dialect.name}") from None
@@ -1,22 +1,20 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from pydantic import ValidationError
-from sqlalchemy.orm import Session
+# Shared FastAPI dependencies. The session dependencies live in
+# app.db.session and the auth ones in app.core.auth, this module only
+# re-exports them so there is a single definition of each.
+from app.core.auth import (
+    get_current_active_user,
+    get_current_admin_user,
+    get_current_user,
+    oauth2_scheme,
+)
+from app.db.session import DatabaseRunner, get_db, get_db_runner
 
-from app.db.session import SessionLocal
-from app.core.auth import get_current_user
-from app.schemas.user import TokenPayload
-from app.config import settings
-
-# OAuth2 scheme for token
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
-
-# Dependency to get DB session
-def get_db() -> Generator:
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
\ No newline at end of file
+__all__ = [
+    "DatabaseRunner",
+    "get_current_active_user",
+    "get_current_admin_user",
+    "get_current_user",
+    "get_db",
+    "get_db_runner",
+    "oauth2_scheme",
+]
@@ -1,20 +1,79 @@
-import os
+import time
+
+_import_started = time.perf_counter()
+
+import logging
+import sys
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.api.api import api_router
 from app.config import settings
-from app.db.base import Base
-from app.db.session import engine
+from app.core.metrics import request_metrics
+from app.core.middleware import QueryStatsMiddleware, RequestSizeLimitMiddleware
+from app.core.streaming import MediaStaticFiles
+from app.db import session as db_session
+from app.core.security import password_hasher
+
+# uvicorn and gunicorn only set up their own loggers, report through them
+logger = logging.getLogger("uvicorn.error")
+
+
+def check_schema_revision() -> None:
+    """
+    Tables are created by `alembic upgrade head`, not by the app. Compare
+    the applied revision with the code once per worker instead.
+    """
+    from app.db.migrations import schema_revisions
+
+    current, heads = schema_revisions(db_session.engine)
+    if current == heads:
+        return
+    message = (
+        f"Database schema is at {', '.join(sorted(current)) or 'no revision'}, "
+        f"code expects {', '.join(sorted(heads))}; run `alembic upgrade head`"
+    )
+    if settings.DB_REVISION_CHECK == "strict":
+        raise RuntimeError(message)
+    logger.warning(message)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    timings = {"imports": time.perf_counter() - _import_started}
+
+    if settings.DB_REVISION_CHECK != "off":
+        started = time.perf_counter()
+        await run_in_threadpool(check_schema_revision)
+        timings["revision_check"] = time.perf_counter() - started
+
+    app.state.startup_timings = timings
+    logger.info(
+        "Worker started in %.3fs (%s)",
+        time.perf_counter() - _import_started,
+        ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()),
+    )
+
+    yield
+
+    # Pools that were never used were never imported
+    thumbnails = sys.modules.get("app.services.thumbnail_service")
+    if thumbnails is not None:
+        thumbnails.shutdown_pool()
+    password_hasher.shutdown()
+    if db_session.async_engine is not None:
+        await db_session.async_engine.dispose()
+    db_session.engine.dispose()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set up CORS middleware
@@ -26,8 +85,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount media files directory
-app.mount("/media", StaticFiles(directory=settings.MEDIA_ROOT), name="media")
+# Cap request bodies at the largest possible track upload
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_bytes=(settings.MAX_TRACK_SIZE_MB + settings.MAX_COVER_SIZE_MB + 1) * 1024 * 1024,
+)
+
+# Statement count and database time per request, outermost so the whole
+# request is measured
+app.add_middleware(QueryStatsMiddleware, debug_headers=settings.DEBUG)
+
+# Mount media files directory, content-addressed so served as immutable
+app.mount("/media", MediaStaticFiles(directory=settings.MEDIA_ROOT), name="media")
 
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
@@ -37,6 +106,14 @@ app.include_router(api_router, prefix=settings.API_V1_STR)
 def health_check():
     return {"status": "ok"}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        """Per-endpoint latency and SQL histograms for Prometheus"""
+        return PlainTextResponse(
+            request_metrics.prometheus(), media_type="text/plain; version=0.0.4"
+        )
+
 # Exception handling
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 from pydantic import BaseModel
 
 from app.schemas.track import Track
@@ -16,7 +16,9 @@ class FavoriteWithTrack(Favorite):
 
 class FavoriteList(BaseModel):
     items: List[FavoriteWithTrack]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int
\ No newline at end of file
+    pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
-from typing import Optional, List
-from pydantic import BaseModel
+from typing import Literal, Optional, List
+from pydantic import BaseModel, Field
 
 from app.schemas.track import Track
 
@@ -33,6 +33,8 @@ class PlaylistTrack(BaseModel):
 
 class PlaylistWithTracks(Playlist):
     tracks: List[PlaylistTrack] = []
+    # Number of tracks in the playlist, tracks may be one page of them
+    tracks_total: Optional[int] = None
 
 class AddTrackToPlaylist(BaseModel):
     track_id: int
@@ -41,9 +43,33 @@ class AddTrackToPlaylist(BaseModel):
 class UpdateTrackPosition(BaseModel):
     position: int
 
+class PlaylistTrackOperation(BaseModel):
+    op: Literal["add", "move", "remove"]
+    track_id: int
+    # 1-based, in the playlist as left by the previous operations;
+    # add without a position appends
+    position: Optional[int] = Field(None, ge=1)
+
+class PlaylistTrackBatch(BaseModel):
+    operations: List[PlaylistTrackOperation] = Field(..., min_length=1, max_length=500)
+
+class PlaylistTrackPosition(BaseModel):
+    track_id: int
+    position: int
+
+class PlaylistTrackBatchResult(BaseModel):
+    playlist_id: int
+    size: int
+    added: List[PlaylistTrackPosition] = []
+    # Tracks that were already in the playlist and now have a new position
+    moved: List[PlaylistTrackPosition] = []
+    removed: List[int] = []
+
 class PlaylistList(BaseModel):
     items: List[Playlist]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int
\ No newline at end of file
+    pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -36,7 +36,9 @@ class ReviewWithUserAndTrack(Review):
 
 class ReviewList(BaseModel):
     items: List[ReviewWithUser]
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int
\ No newline at end of file
+    pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Union, Dict
 from pydantic import BaseModel
 
 from app.db.models.track import Genre
@@ -22,6 +22,12 @@ class Track(TrackBase):
     id: int
     cover_path: str
     audio_path: str
+    cover_thumbnails: Optional[Dict[str, str]] = None
+    codec: Optional[str] = None
+    bitrate: Optional[int] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    file_size: Optional[int] = None
 
     class Config:
         orm_mode = True
@@ -34,11 +40,14 @@ class TrackWithStats(Track):
     is_disliked: Optional[bool] = None
 
 class TrackList(BaseModel):
-    items: list[Track]
-    total: int
-    page: int
+    # TrackWithStats when requested with include=stats
+    items: list[Union[TrackWithStats, Track]]
+    total: Optional[int] = None
+    page: Optional[int] = None
     size: int
-    pages: int
+    pages: Optional[int] = None
+    has_more: bool = False
+    next_cursor: Optional[str] = None
     
 # Вспомогательный класс для получения списка жанров
 class GenreList(BaseModel):
@@ -35,6 +35,17 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+    expires_in: Optional[int] = None
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 class TokenPayload(BaseModel):
-    sub: Optional[int] = None
\ No newline at end of file
+    sub: Optional[int] = None
+    type: Optional[str] = None
+    iat: Optional[float] = None
+    exp: Optional[float] = None
+    jti: Optional[str] = None
+    role: Optional[UserRole] = None
+    active: Optional[bool] = None
\ No newline at end of file
@@ -0,0 +1,393 @@
+import os
+import struct
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+# Only this much of the file start is read when looking for headers
+HEADER_BYTES = 256 * 1024
+# Ogg duration comes from the granule position of the last page
+OGG_TAIL_BYTES = 64 * 1024
+
+
+@dataclass
+class AudioInfo:
+    codec: str
+    duration: float
+    bitrate: Optional[int]
+    sample_rate: Optional[int]
+    channels: Optional[int]
+    file_size: int
+
+
+class AudioProbeError(ValueError):
+    pass
+
+
+def _average_bitrate(size: int, duration: float) -> Optional[int]:
+    """Average bitrate in kbps"""
+    if duration <= 0:
+        return None
+    return int(round(size * 8 / duration / 1000))
+
+
+# MP3
+
+_MPEG_BITRATES = {
+    # (version is MPEG-1, layer): kbps by index
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MPEG_SAMPLE_RATES = {
+    3: [44100, 48000, 32000],  # MPEG-1
+    2: [22050, 24000, 16000],  # MPEG-2
+    0: [11025, 12000, 8000],   # MPEG-2.5
+}
+
+
+def _parse_mpeg_header(header: int):
+    if header & 0xFFE00000 != 0xFFE00000:
+        return None
+    version_bits = (header >> 19) & 0x3
+    layer_bits = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    sample_rate_index = (header >> 10) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+
+    mpeg1 = version_bits == 3
+    layer = 4 - layer_bits
+    bitrate = _MPEG_BITRATES[(mpeg1, layer)][bitrate_index]
+    sample_rate = _MPEG_SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (header >> 9) & 0x1
+    channels = 1 if (header >> 6) & 0x3 == 3 else 2
+
+    if layer == 1:
+        samples = 384
+        frame_length = (12 * bitrate * 1000 // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or mpeg1) else 576
+        frame_length = samples // 8 * bitrate * 1000 // sample_rate + padding
+    return {
+        "mpeg1": mpeg1,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "samples": samples,
+        "frame_length": frame_length,
+    }
+
+
+def _probe_mp3(file: BinaryIO, size: int) -> AudioInfo:
+    base = 0
+    head = file.read(10)
+    if head[:3] == b"ID3" and len(head) == 10:
+        # Syncsafe tag size, plus the optional footer
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        base = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    file.seek(base)
+    data = file.read(HEADER_BYTES)
+
+    frame = None
+    position = 0
+    while True:
+        position = data.find(b"\xff", position)
+        if position < 0 or position + 4 > len(data):
+            raise AudioProbeError("no MPEG audio frame found")
+        frame = _parse_mpeg_header(struct.unpack(">I", data[position:position + 4])[0])
+        if frame:
+            # Make sure the next frame lines up, to skip false syncs
+            following = position + frame["frame_length"]
+            if following + 4 > len(data) or _parse_mpeg_header(
+                struct.unpack(">I", data[following:following + 4])[0]
+            ):
+                break
+        position += 1
+
+    audio_start = base + position
+    audio_size = size - audio_start
+    if size >= 128:
+        file.seek(size - 128)
+        if file.read(3) == b"TAG":
+            audio_size -= 128
+
+    # Xing/Info (LAME) or VBRI headers carry the frame count of VBR files
+    frames = None
+    if frame["mpeg1"]:
+        side_info = 17 if frame["channels"] == 1 else 32
+    else:
+        side_info = 9 if frame["channels"] == 1 else 17
+    xing = position + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info"):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        field = xing + 8
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[field:field + 4])[0]
+            field += 4
+        if flags & 0x2:
+            audio_size = struct.unpack(">I", data[field:field + 4])[0]
+    elif data[position + 36:position + 40] == b"VBRI":
+        frames = struct.unpack(">I", data[position + 50:position + 54])[0]
+
+    if frames:
+        duration = frames * frame["samples"] / frame["sample_rate"]
+        bitrate = _average_bitrate(audio_size, duration)
+    else:
+        bitrate = frame["bitrate"]
+        duration = audio_size * 8 / (bitrate * 1000)
+
+    return AudioInfo(
+        codec="mp3" if frame["layer"] == 3 else f"mp{frame['layer']}",
+        duration=duration,
+        bitrate=bitrate,
+        sample_rate=frame["sample_rate"],
+        channels=frame["channels"],
+        file_size=size,
+    )
+
+
+# FLAC
+
+def _probe_flac(file: BinaryIO, size: int) -> AudioInfo:
+    data = file.read(4 + 4 + 34)
+    if len(data) < 42 or data[:4] != b"fLaC" or data[4] & 0x7F != 0:
+        raise AudioProbeError("missing FLAC STREAMINFO")
+    info = data[8:42]
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate:
+        raise AudioProbeError("invalid FLAC sample rate")
+    duration = total_samples / sample_rate
+    return AudioInfo(
+        codec="flac",
+        duration=duration,
+        bitrate=_average_bitrate(size, duration),
+        sample_rate=sample_rate,
+        channels=channels,
+        file_size=size,
+    )
+
+
+# WAV
+
+def _probe_wav(file: BinaryIO, size: int) -> AudioInfo:
+    header = file.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        raise AudioProbeError("not a RIFF/WAVE file")
+
+    fmt = None
+    data_size = None
+    position = 12
+    while position + 8 <= size:
+        file.seek(position)
+        chunk_header = file.read(8)
+        if len(chunk_header) < 8:
+            break
+        chunk_id, chunk_size = chunk_header[:4], struct.unpack("<I", chunk_header[4:])[0]
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", file.read(16))
+        elif chunk_id == b"data":
+            # Streamed WAVs may leave the size unset
+            data_size = min(chunk_size, size - position - 8)
+            break
+        position += 8 + chunk_size + (chunk_size & 1)
+
+    if fmt is None or data_size is None:
+        raise AudioProbeError("missing fmt or data chunk")
+    audio_format, channels, sample_rate, byte_rate, _, _ = fmt
+    if not byte_rate:
+        raise AudioProbeError("invalid WAV byte rate")
+    return AudioInfo(
+        codec="pcm" if audio_format in (1, 0xFFFE) else f"wav-{audio_format:#x}",
+        duration=data_size / byte_rate,
+        bitrate=int(round(byte_rate * 8 / 1000)),
+        sample_rate=sample_rate,
+        channels=channels,
+        file_size=size,
+    )
+
+
+# OGG (Vorbis, Opus)
+
+def _probe_ogg(file: BinaryIO, size: int) -> AudioInfo:
+    data = file.read(HEADER_BYTES)
+    if data[:4] != b"OggS" or len(data) < 28:
+        raise AudioProbeError("not an Ogg stream")
+    segments = data[26]
+    packet = data[27 + segments:]
+
+    pre_skip = 0
+    if packet[:7] == b"\x01vorbis":
+        codec = "vorbis"
+        channels = packet[11]
+        sample_rate = struct.unpack("<I", packet[12:16])[0]
+        granule_rate = sample_rate
+    elif packet[:8] == b"OpusHead":
+        codec = "opus"
+        channels = packet[9]
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+        sample_rate = struct.unpack("<I", packet[12:16])[0] or 48000
+        # Opus granule positions always count 48 kHz samples
+        granule_rate = 48000
+    elif packet[:5] == b"\x7fFLAC":
+        codec = "flac"
+        info = packet[13:47]
+        packed = int.from_bytes(info[10:18], "big")
+        sample_rate = packed >> 44
+        channels = ((packed >> 41) & 0x7) + 1
+        granule_rate = sample_rate
+    else:
+        raise AudioProbeError("unsupported Ogg codec")
+
+    if not granule_rate:
+        raise AudioProbeError("invalid Ogg sample rate")
+
+    tail_start = max(size - OGG_TAIL_BYTES, 0)
+    file.seek(tail_start)
+    tail = file.read(OGG_TAIL_BYTES)
+    last_page = tail.rfind(b"OggS")
+    if last_page < 0 or last_page + 14 > len(tail):
+        raise AudioProbeError("no final Ogg page")
+    granule = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0]
+    duration = max(granule - pre_skip, 0) / granule_rate
+
+    return AudioInfo(
+        codec=codec,
+        duration=duration,
+        bitrate=_average_bitrate(size, duration),
+        sample_rate=sample_rate,
+        channels=channels,
+        file_size=size,
+    )
+
+
+# MP4 / M4A
+
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+# moov/trak/mdia/minf/stbl is as deep as real files go
+_MP4_MAX_DEPTH = 8
+
+
+def _mp4_boxes(file: BinaryIO, start: int, end: int):
+    """Yield (type, payload offset, payload size) without reading payloads"""
+    position = start
+    while position + 8 <= end:
+        file.seek(position)
+        header = file.read(8)
+        if len(header) < 8:
+            return
+        box_size, box_type = struct.unpack(">I4s", header)
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack(">Q", file.read(8))[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - position
+        if box_size < header_size:
+            return
+        yield box_type, position + header_size, box_size - header_size
+        position += box_size
+
+
+def _probe_mp4(file: BinaryIO, size: int) -> AudioInfo:
+    timescale = duration_units = None
+    codec = None
+    sample_rate = channels = None
+
+    # Depth-first in file order with an explicit stack: nesting comes from
+    # the upload, recursion would let it raise RecursionError
+    stack = [_mp4_boxes(file, 0, size)]
+    while stack:
+        box = next(stack[-1], None)
+        if box is None:
+            stack.pop()
+            continue
+        box_type, offset, length = box
+        if box_type in _MP4_CONTAINERS:
+            if len(stack) >= _MP4_MAX_DEPTH:
+                raise AudioProbeError("mp4 boxes nested too deep")
+            stack.append(_mp4_boxes(file, offset, offset + length))
+        elif box_type == b"mvhd":
+            file.seek(offset)
+            payload = file.read(min(length, 32))
+            if payload[0] == 1:
+                timescale, duration_units = struct.unpack(">IQ", payload[20:32])
+            else:
+                timescale, duration_units = struct.unpack(">II", payload[12:20])
+        elif box_type == b"stsd" and codec is None:
+            file.seek(offset)
+            payload = file.read(min(length, 64))
+            # version/flags, entry count, then the first sample entry
+            entry = payload[8:]
+            if len(entry) >= 36:
+                codec = entry[4:8].decode("latin-1").strip()
+                channels = struct.unpack(">H", entry[24:26])[0]
+                sample_rate = struct.unpack(">I", entry[32:36])[0] >> 16
+
+    if not timescale or duration_units is None:
+        raise AudioProbeError("missing mvhd box")
+
+    duration = duration_units / timescale
+    codec = {"mp4a": "aac", "alac": "alac", "ac-3": "ac3", "ec-3": "eac3"}.get(codec, codec or "mp4")
+    return AudioInfo(
+        codec=codec,
+        duration=duration,
+        bitrate=_average_bitrate(size, duration),
+        sample_rate=sample_rate,
+        channels=channels,
+        file_size=size,
+    )
+
+
+def _sniff(head: bytes) -> Optional[str]:
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+_PROBES = {
+    "mp3": _probe_mp3,
+    "flac": _probe_flac,
+    "wav": _probe_wav,
+    "ogg": _probe_ogg,
+    "mp4": _probe_mp4,
+}
+
+
+_EXTENSIONS = {"mp3": "mp3", "flac": "flac", "wav": "wav", "ogg": "ogg", "m4a": "mp4"}
+
+
+def probe_audio(path: str) -> AudioInfo:
+    """
+    Read duration, bitrate, codec and stream parameters from audio headers.
+    Only the headers (and for Ogg the last page) are read, never the whole
+    file. The container is detected from magic bytes, not the extension.
+    :param path: path to the audio file
+    :return: audio info
+    :raises AudioProbeError: if the format is unknown or the headers are broken
+    """
+    size = os.path.getsize(path)
+    extension = path.rsplit(".", 1)[-1].lower()
+    with open(path, "rb") as file:
+        kind = _sniff(file.read(12)) or _EXTENSIONS.get(extension)
+        if kind is None:
+            raise AudioProbeError("unknown audio format")
+        file.seek(0)
+        try:
+            return _PROBES[kind](file, size)
+        except (struct.error, IndexError) as e:
+            raise AudioProbeError(f"truncated {kind} headers") from e
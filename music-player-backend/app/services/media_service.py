@@ -0,0 +1,196 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, List
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.db.models.media_blob import RECLAIM_KEY, acquire_blob, reclaim_blob, release_blob
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StoredFile:
+    """File written into MEDIA_ROOT by save_upload"""
+    relative_path: str
+    full_path: str
+    size: int
+    sha256: str
+
+    @property
+    def url(self) -> str:
+        return f"/media/{self.relative_path}"
+
+
+def file_extension(filename: str) -> str:
+    return filename.split(".")[-1].lower()
+
+
+def _write_chunk(buffer: BinaryIO, hasher, chunk: bytes) -> None:
+    # hashlib releases the GIL for large buffers, so both run in parallel
+    # with the event loop
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def content_path(directory: str, sha256: str, extension: str) -> str:
+    """Content-addressed path relative to MEDIA_ROOT, sharded by hash prefix"""
+    return os.path.join(directory, sha256[:2], f"{sha256}.{extension}")
+
+
+def _finish(buffer: BinaryIO, temp_path: str, full_path: str) -> None:
+    if os.path.exists(full_path):
+        # Same bytes are already stored under this name
+        _discard(buffer, temp_path)
+        return
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    # A concurrent upload of the same content may win the race, replacing
+    # its file with identical bytes is harmless
+    os.replace(temp_path, full_path)
+
+
+def _acquire(db: Session, relative_path: str) -> None:
+    with db.get_bind().begin() as connection:
+        acquire_blob(connection, relative_path)
+
+
+def _discard(buffer: BinaryIO, temp_path: str) -> None:
+    buffer.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+async def save_upload(db: Session, upload: UploadFile, directory: str, max_size_mb: int) -> StoredFile:
+    """
+    Stream an upload into the content-addressed store under MEDIA_ROOT/directory.
+
+    Chunks go to a temporary file next to the destination while the size
+    limit is checked and the SHA-256 is computed incrementally; the file is
+    renamed into place only once it is complete, so readers never see a
+    partial file. The final name is the hash, so if the same content is
+    already stored the temporary file is dropped and the existing one is
+    reused. Disk I/O runs in the threadpool, not on the event loop.
+
+    The upload holds its own blob reference, committed before the existing
+    file is relied on, so a concurrent delete of the last track using it
+    can't reclaim the file. Release it with release_stored_files once the
+    track is inserted, or when the request fails.
+
+    :param db: session, the reference is committed on its own connection
+    :param upload: uploaded file
+    :param directory: subdirectory of MEDIA_ROOT (COVERS_DIR or TRACKS_DIR)
+    :param max_size_mb: size limit in megabytes
+    :return: stored file info
+    """
+    max_bytes = max_size_mb * 1024 * 1024
+    chunk_size = settings.UPLOAD_CHUNK_SIZE_KB * 1024
+    target_dir = os.path.join(settings.MEDIA_ROOT, directory)
+
+    fd, temp_path = await run_in_threadpool(
+        tempfile.mkstemp, dir=target_dir, prefix=".upload-", suffix=".part"
+    )
+    buffer = os.fdopen(fd, "wb")
+    hasher = hashlib.sha256()
+    size = 0
+    relative_path = None
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File {upload.filename} is larger than {max_size_mb} MB"
+                )
+            await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+
+        sha256 = hasher.hexdigest()
+        path = content_path(directory, sha256, file_extension(upload.filename))
+        full_path = os.path.join(settings.MEDIA_ROOT, path)
+        await run_in_threadpool(_acquire, db, path)
+        relative_path = path
+        await run_in_threadpool(_finish, buffer, temp_path, full_path)
+    except BaseException:
+        await run_in_threadpool(_discard, buffer, temp_path)
+        if relative_path is not None:
+            await run_in_threadpool(_release, db, [relative_path])
+        raise
+
+    return StoredFile(
+        relative_path=relative_path,
+        full_path=full_path,
+        size=size,
+        sha256=sha256,
+    )
+
+
+def release_stored_files(db: Session, files: List[StoredFile]) -> None:
+    """
+    Drop the references save_upload took. After a failed request this
+    deletes the files nothing else references; after a successful one the
+    new track holds its own reference and every file stays.
+    """
+    _release(db, [stored.relative_path for stored in files])
+
+
+def _release(db: Session, paths: Iterable[str]) -> None:
+    bind = db.get_bind()
+    last = []
+    with bind.begin() as connection:
+        for path in paths:
+            if release_blob(connection, path):
+                last.append(path)
+    reclaim_blobs(bind, last)
+
+
+def reclaim_media_file(relative_path: str) -> None:
+    """Delete an unreferenced blob together with its derived thumbnails"""
+    full_path = os.path.join(settings.MEDIA_ROOT, relative_path)
+    if os.path.exists(full_path):
+        os.remove(full_path)
+
+    if relative_path.startswith(settings.COVERS_DIR + os.sep):
+        stem = os.path.splitext(os.path.basename(relative_path))[0]
+        thumbs_dir = os.path.join(settings.MEDIA_ROOT, settings.COVERS_DIR, settings.THUMBNAILS_DIR)
+        for thumbnail in glob.glob(os.path.join(thumbs_dir, f"{glob.escape(stem)}_*.webp")):
+            os.remove(thumbnail)
+
+
+def reclaim_blobs(bind, paths: Iterable[str]) -> None:
+    """
+    Delete blobs whose last reference went away, row and file together.
+    A blob an upload has acquired again in the meantime stays.
+    """
+    for path in paths:
+        try:
+            with bind.begin() as connection:
+                if reclaim_blob(connection, path):
+                    reclaim_media_file(path)
+        except OSError:
+            # The row stays at zero, the next upload of the content reuses it
+            logger.exception("Could not reclaim media file %s", path)
+
+
+@event.listens_for(Session, "after_commit")
+def _reclaim_after_commit(session: Session) -> None:
+    paths = session.info.pop(RECLAIM_KEY, None)
+    if paths:
+        reclaim_blobs(session.get_bind(), paths)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_reclaim(session: Session) -> None:
+    session.info.pop(RECLAIM_KEY, None)
@@ -0,0 +1,364 @@
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, bindparam, func, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.core.auth import Principal
+from app.db.session import SessionLocal
+from app.db.models.playlist import POSITION_GAP, Playlist, PlaylistTrack
+from app.db.models.track import Track
+from app.schemas.playlist import (
+    Playlist as PlaylistSchema,
+    PlaylistTrack as PlaylistTrackSchema,
+    PlaylistTrackBatchResult,
+    PlaylistTrackOperation,
+    PlaylistTrackPosition,
+    PlaylistWithTracks,
+)
+from app.schemas.track import Track as TrackSchema
+
+
+def get_owned_playlist(db: Session, playlist_id: int, current_user: Principal, lock: bool = False) -> Playlist:
+    """
+    Playlist the current user may modify
+    :param lock: lock the playlist row until commit, so concurrent
+        changes to its tracks are applied one after another
+    """
+    query = db.query(Playlist).filter(Playlist.id == playlist_id)
+    if lock:
+        query = query.with_for_update()
+    playlist = query.first()
+    if not playlist:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+
+    if playlist.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to modify this playlist"
+        )
+    return playlist
+
+
+def _ordered_rows(db: Session, playlist_id: int):
+    return (
+        db.query(PlaylistTrack.id, PlaylistTrack.track_id, PlaylistTrack.position)
+        .filter(PlaylistTrack.playlist_id == playlist_id)
+        .order_by(PlaylistTrack.position, PlaylistTrack.id)
+        .all()
+    )
+
+
+def _update_positions(db: Session, changes: List[Dict[str, int]]) -> None:
+    """One executemany UPDATE for [{"row_id": ..., "new_position": ...}]"""
+    if not changes:
+        return
+    table = PlaylistTrack.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(position=bindparam("new_position")),
+        changes,
+    )
+
+
+def rebalance_playlist(db: Session, playlist_id: int) -> None:
+    """
+    Respace a playlist's sort keys POSITION_GAP apart, keeping the order.
+    Only rows whose key changes are written; the caller commits.
+    """
+    _update_positions(db, [
+        {"row_id": row.id, "new_position": index * POSITION_GAP}
+        for index, row in enumerate(_ordered_rows(db, playlist_id), start=1)
+        if row.position != index * POSITION_GAP
+    ])
+
+
+def rebalance_playlist_in_background(playlist_id: int) -> None:
+    """Background task: rebalance a playlist whose keys ran out of room"""
+    db = SessionLocal()
+    try:
+        db.query(Playlist.id).filter(Playlist.id == playlist_id).with_for_update().first()
+        rebalance_playlist(db, playlist_id)
+        db.commit()
+    finally:
+        db.close()
+
+
+def key_between(before: Optional[int], after: Optional[int]) -> Optional[int]:
+    """
+    Sort key strictly between two neighbours, None is the playlist edge
+    :return: the key, or None if the neighbours are adjacent
+    """
+    if before is None and after is None:
+        return POSITION_GAP
+    if after is None:
+        return before + POSITION_GAP
+    if before is None:
+        return after - POSITION_GAP
+    if after - before < 2:
+        return None
+    return (before + after) // 2
+
+
+def _neighbour_keys(
+    db: Session, playlist_id: int, position: Optional[int], exclude_row_id: Optional[int]
+) -> Tuple[Optional[int], Optional[int]]:
+    # Keys of the tracks that will end up right before and after the
+    # 1-based position, found through the (playlist_id, position) index
+    query = db.query(PlaylistTrack.position).filter(PlaylistTrack.playlist_id == playlist_id)
+    if exclude_row_id is not None:
+        query = query.filter(PlaylistTrack.id != exclude_row_id)
+    if position is not None:
+        ordered = query.order_by(PlaylistTrack.position, PlaylistTrack.id)
+        if position <= 1:
+            return None, ordered.limit(1).scalar()
+        keys = [key for (key,) in ordered.offset(position - 2).limit(2)]
+        if keys:
+            return keys[0], keys[1] if len(keys) > 1 else None
+    # Append
+    return query.with_entities(func.max(PlaylistTrack.position)).scalar(), None
+
+
+def place_track(
+    db: Session, playlist_id: int, position: Optional[int], exclude_row_id: Optional[int] = None
+) -> Tuple[int, bool]:
+    """
+    Sort key for a track inserted or moved to a 1-based position.
+    When the neighbours leave no room the playlist is rebalanced first.
+    :param position: target position, None or past the end appends
+    :param exclude_row_id: row being moved
+    :return: key, and whether the neighbourhood is now full so the
+        playlist should be rebalanced before the next insert there
+    """
+    before, after = _neighbour_keys(db, playlist_id, position, exclude_row_id)
+    key = key_between(before, after)
+    if key is None:
+        rebalance_playlist(db, playlist_id)
+        before, after = _neighbour_keys(db, playlist_id, position, exclude_row_id)
+        key = key_between(before, after)
+
+    crowded = (before is not None and key - before < 2) or (after is not None and after - key < 2)
+    return key, crowded
+
+
+def assign_keys(keys: List[Optional[int]]) -> List[int]:
+    """
+    Sort keys for a new order of rows, changing as few as possible.
+    Rows forming the longest run of increasing current keys keep them;
+    the others (and new rows, None) are spread between those anchors.
+    Falls back to respacing everything when an interval is too tight.
+    :param keys: current key of each row in the new order, None for new rows
+    :return: key for each row
+    """
+    # Longest strictly increasing subsequence of the existing keys
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous: List[Optional[int]] = [None] * len(keys)
+    for index, key in enumerate(keys):
+        if key is None:
+            continue
+        slot = bisect.bisect_left(tails, key)
+        if slot > 0:
+            previous[index] = tail_index[slot - 1]
+        if slot == len(tail_index):
+            tail_index.append(index)
+            tails.append(key)
+        else:
+            tail_index[slot] = index
+            tails[slot] = key
+    anchors = set()
+    index = tail_index[-1] if tail_index else None
+    while index is not None:
+        anchors.add(index)
+        index = previous[index]
+
+    result: List[Optional[int]] = [keys[i] if i in anchors else None for i in range(len(keys))]
+    start = 0
+    while start < len(result):
+        if result[start] is not None:
+            start += 1
+            continue
+        end = start
+        while end < len(result) and result[end] is None:
+            end += 1
+        before = result[start - 1] if start > 0 else None
+        after = result[end] if end < len(result) else None
+        count = end - start
+        if before is None and after is None:
+            filled = [(i + 1) * POSITION_GAP for i in range(count)]
+        elif after is None:
+            filled = [before + (i + 1) * POSITION_GAP for i in range(count)]
+        elif before is None:
+            filled = [after - (count - i) * POSITION_GAP for i in range(count)]
+        else:
+            step = (after - before) // (count + 1)
+            if step < 1:
+                return [(i + 1) * POSITION_GAP for i in range(len(keys))]
+            filled = [before + (i + 1) * step for i in range(count)]
+        result[start:end] = filled
+        start = end
+    return result
+
+
+def load_playlist_with_tracks(
+    db: Session,
+    playlist_id: int,
+    current_user: Principal,
+    tracks_offset: int = 0,
+    tracks_limit: Optional[int] = None,
+) -> PlaylistWithTracks:
+    """
+    Playlist with its tracks in position order, checking read access.
+    One query: the playlist outer-joined to its (optionally paged) tracks,
+    with the track count as a scalar subquery when paging. Rows go
+    straight into the schema; the ORM relationships are not touched.
+    :param db: database session
+    :param playlist_id: playlist id
+    :param current_user: user asking for the playlist
+    :param tracks_offset: tracks to skip
+    :param tracks_limit: page size, None returns every track
+    :return: serialized playlist
+    """
+    paged = bool(tracks_offset) or tracks_limit is not None
+    columns = [Playlist, Track]
+    joined = PlaylistTrack.playlist_id == Playlist.id
+    if paged:
+        entry = aliased(PlaylistTrack)
+        page = (
+            select(entry.id)
+            .where(entry.playlist_id == playlist_id)
+            .order_by(entry.position, entry.id)
+            .offset(tracks_offset)
+            .limit(tracks_limit)
+        )
+        joined = and_(joined, PlaylistTrack.id.in_(page))
+        columns.append(
+            select(func.count(entry.id))
+            .where(entry.playlist_id == Playlist.id)
+            .scalar_subquery()
+        )
+
+    rows = (
+        db.query(*columns)
+        .select_from(Playlist)
+        .outerjoin(PlaylistTrack, joined)
+        .outerjoin(Track, Track.id == PlaylistTrack.track_id)
+        .filter(Playlist.id == playlist_id)
+        .order_by(PlaylistTrack.position, PlaylistTrack.id)
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=404, detail="Playlist not found")
+    playlist = rows[0][0]
+
+    # Check access
+    if playlist.user_id != current_user.id and not playlist.is_public:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You don't have permission to view this playlist"
+        )
+
+    # Stored positions are sparse sort keys, clients see 1, 2, 3...
+    tracks = [
+        PlaylistTrackSchema(
+            track=TrackSchema.model_validate(track, from_attributes=True),
+            position=position,
+        )
+        for position, track in enumerate(
+            (row[1] for row in rows if row[1] is not None), start=tracks_offset + 1
+        )
+    ]
+    return PlaylistWithTracks(
+        **PlaylistSchema.model_validate(playlist, from_attributes=True).model_dump(),
+        tracks=tracks,
+        tracks_total=rows[0][2] if paged else len(tracks),
+    )
+
+
+def _operation_error(index: int, status_code: int, detail: str) -> HTTPException:
+    return HTTPException(status_code=status_code, detail=f"Operation {index}: {detail}")
+
+
+def apply_playlist_operations(
+    db: Session, playlist_id: int, operations: List[PlaylistTrackOperation], current_user: Principal
+) -> PlaylistTrackBatchResult:
+    """
+    Apply add/move/remove operations to a playlist in one transaction.
+    The operations are replayed on the in-memory track order, then rows are
+    written once: inserts, deletes and one executemany UPDATE for the rows
+    whose sort key had to change. Any invalid operation rejects the
+    whole batch before anything is written.
+    :param db: database session
+    :param playlist_id: playlist id
+    :param operations: operations in the order they apply
+    :param current_user: playlist owner
+    :return: positions of added and moved tracks and the removed track ids
+    """
+    get_owned_playlist(db, playlist_id, current_user, lock=True)
+
+    rows = _ordered_rows(db, playlist_id)
+    order = [row.track_id for row in rows]
+    members = set(order)
+    existing = {row.track_id: row for row in rows}
+
+    new_track_ids = {operation.track_id for operation in operations if operation.op == "add"} - existing.keys()
+    known_tracks = set()
+    if new_track_ids:
+        known_tracks = {
+            track_id for (track_id,) in db.query(Track.id).filter(Track.id.in_(new_track_ids))
+        }
+
+    for index, operation in enumerate(operations):
+        track_id = operation.track_id
+        if operation.op == "add":
+            if track_id in members:
+                raise _operation_error(index, status.HTTP_400_BAD_REQUEST, "Track is already in playlist")
+            if track_id not in existing and track_id not in known_tracks:
+                raise _operation_error(index, status.HTTP_404_NOT_FOUND, "Track not found")
+            position = operation.position or len(order) + 1
+            order.insert(min(position, len(order) + 1) - 1, track_id)
+            members.add(track_id)
+            continue
+
+        if track_id not in members:
+            raise _operation_error(index, status.HTTP_404_NOT_FOUND, "Track not found in playlist")
+        if operation.op == "move" and operation.position is None:
+            raise _operation_error(index, status.HTTP_400_BAD_REQUEST, "Position is required")
+        order.remove(track_id)
+        if operation.op == "move":
+            order.insert(min(operation.position, len(order) + 1) - 1, track_id)
+        else:
+            members.discard(track_id)
+
+    # Single pass over the final order: positions for the response, and
+    # sort keys that only change where the order had to
+    positions: Dict[int, int] = {track_id: position for position, track_id in enumerate(order, start=1)}
+    old_positions = {row.track_id: position for position, row in enumerate(rows, start=1)}
+    keys = assign_keys([existing[track_id].position if track_id in existing else None for track_id in order])
+
+    result = PlaylistTrackBatchResult(playlist_id=playlist_id, size=len(order))
+    changed = []
+    for track_id, key in zip(order, keys):
+        row = existing.get(track_id)
+        if row is None:
+            db.add(PlaylistTrack(playlist_id=playlist_id, track_id=track_id, position=key))
+            result.added.append(PlaylistTrackPosition(track_id=track_id, position=positions[track_id]))
+            continue
+        if key != row.position:
+            changed.append({"row_id": row.id, "new_position": key})
+        if positions[track_id] != old_positions[track_id]:
+            result.moved.append(PlaylistTrackPosition(track_id=track_id, position=positions[track_id]))
+    result.removed = [track_id for track_id in existing if track_id not in positions]
+
+    if result.removed:
+        db.query(PlaylistTrack).filter(
+            PlaylistTrack.playlist_id == playlist_id,
+            PlaylistTrack.track_id.in_(result.removed)
+        ).delete(synchronize_session=False)
+    _update_positions(db, changed)
+
+    db.commit()
+
+    return result
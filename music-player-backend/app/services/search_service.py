@@ -0,0 +1,209 @@
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import case, false, func, literal_column, or_
+from sqlalchemy.orm import Query, Session
+
+from app.db.models.track import Track
+
+# Weights used by the fallback index, roughly mirroring the 'A'/'B' weights of
+# the PostgreSQL tsvector (title matters more than artist).
+TITLE_EXACT_WEIGHT = 3.0
+TITLE_PREFIX_WEIGHT = 2.0
+ARTIST_EXACT_WEIGHT = 1.5
+ARTIST_PREFIX_WEIGHT = 1.0
+SUBSTRING_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_vector():
+    """
+    tsvector expression over title (weight A) and artist (weight B).
+    Must stay identical to the expression of ix_tracks_search_vector.
+    """
+    return func.setweight(
+        func.to_tsvector(literal_column("'simple'"), Track.title),
+        literal_column("'A'"),
+    ).op("||")(
+        func.setweight(
+            func.to_tsvector(literal_column("'simple'"), Track.artist),
+            literal_column("'B'"),
+        )
+    )
+
+
+def prefix_tsquery(tokens: List[str]):
+    """Build a prefix tsquery ('moo:* & ali:*') for typeahead matching"""
+    return func.to_tsquery(
+        literal_column("'simple'"),
+        " & ".join(f"{token}:*" for token in tokens),
+    )
+
+
+class _IndexSnapshot:
+    """Built index structures, never modified once built"""
+
+    def __init__(
+        self, documents: Dict[int, Tuple[str, str]], postings: Dict[str, Dict[int, float]]
+    ) -> None:
+        self.documents = documents
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+
+
+class FallbackSearchIndex:
+    """
+    In-memory inverted index used when the database has no full-text support
+    (SQLite test setups). Tokens are kept sorted so prefix lookups are a
+    binary search instead of a scan over the vocabulary.
+
+    The lock only guards swapping the snapshot: the rows are read without
+    it, since with DB_ASYNC those reads run on the event loop and a search
+    waiting on the lock there would block the loop for good.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_IndexSnapshot] = None
+        # Bumped on every invalidate, so a build that started before it
+        # doesn't install stale rows
+        self._generation = 0
+
+    def invalidate(self) -> None:
+        """Drop the index; it is rebuilt from the database on next search"""
+        with self._lock:
+            self._snapshot = None
+            self._generation += 1
+
+    def _build(self, db: Session) -> _IndexSnapshot:
+        documents = {}
+        postings: Dict[str, Dict[int, float]] = {}
+        for track_id, title, artist in db.query(Track.id, Track.title, Track.artist):
+            documents[track_id] = ((title or "").lower(), (artist or "").lower())
+            for token in tokenize(artist):
+                bucket = postings.setdefault(token, {})
+                bucket[track_id] = max(bucket.get(track_id, 0.0), ARTIST_EXACT_WEIGHT)
+            for token in tokenize(title):
+                bucket = postings.setdefault(token, {})
+                bucket[track_id] = max(bucket.get(track_id, 0.0), TITLE_EXACT_WEIGHT)
+        return _IndexSnapshot(documents, postings)
+
+    def _snapshot_for(self, db: Session) -> _IndexSnapshot:
+        with self._lock:
+            snapshot, generation = self._snapshot, self._generation
+        if snapshot is not None:
+            return snapshot
+
+        # Concurrent first searches may each build, the index is small
+        snapshot = self._build(db)
+        with self._lock:
+            if self._generation == generation:
+                self._snapshot = snapshot
+        return snapshot
+
+    @staticmethod
+    def _match_token(snapshot: _IndexSnapshot, token: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        start = bisect_left(snapshot.vocabulary, token)
+        for word in snapshot.vocabulary[start:]:
+            if not word.startswith(token):
+                break
+            exact = word == token
+            for track_id, weight in snapshot.postings[word].items():
+                if not exact:
+                    weight = TITLE_PREFIX_WEIGHT if weight == TITLE_EXACT_WEIGHT else ARTIST_PREFIX_WEIGHT
+                if weight > scores.get(track_id, 0.0):
+                    scores[track_id] = weight
+        return scores
+
+    def search(self, db: Session, text: str) -> List[int]:
+        """
+        Return matching track ids ordered by relevance.
+        Every query token has to prefix-match a word of the title or artist;
+        plain substring matches are kept with a low score so results stay a
+        superset of the old ILIKE behaviour.
+        """
+        snapshot = self._snapshot_for(db)
+
+        tokens = tokenize(text)
+        scores: Dict[int, float] = {}
+        if tokens:
+            per_token = [self._match_token(snapshot, token) for token in tokens]
+            common = set(per_token[0])
+            for matches in per_token[1:]:
+                common &= set(matches)
+            for track_id in common:
+                scores[track_id] = sum(matches[track_id] for matches in per_token)
+
+        needle = text.lower().strip()
+        if needle:
+            for track_id, (title, artist) in snapshot.documents.items():
+                if track_id not in scores and (needle in title or needle in artist):
+                    scores[track_id] = SUBSTRING_WEIGHT
+
+        return sorted(scores, key=lambda track_id: (-scores[track_id], track_id))
+
+
+fallback_index = FallbackSearchIndex()
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def apply_track_search(db: Session, query: Query, search: str) -> Query:
+    """
+    Filter a Track query by search text and order it by relevance.
+
+    On PostgreSQL this uses the GIN indexes from the search migration:
+    a weighted tsvector with prefix matching for typeahead, and trigram
+    indexes that back the substring ILIKE match. Other databases go
+    through the in-memory fallback index.
+    """
+    tokens = tokenize(search)
+
+    if is_postgres(db):
+        pattern = f"%{escape_like(search)}%"
+        substring = or_(
+            Track.title.ilike(pattern, escape="\\"),
+            Track.artist.ilike(pattern, escape="\\"),
+        )
+        if not tokens:
+            return query.filter(substring).order_by(Track.id)
+
+        tsquery = prefix_tsquery(tokens)
+        vector = search_vector()
+        rank = func.ts_rank(vector, tsquery) + func.greatest(
+            func.similarity(Track.title, search),
+            func.similarity(Track.artist, search),
+        )
+        return (
+            query.filter(or_(vector.op("@@")(tsquery), substring))
+            .order_by(rank.desc(), Track.id)
+        )
+
+    track_ids = fallback_index.search(db, search)
+    if not track_ids:
+        return query.filter(false())
+    ordering = case({track_id: i for i, track_id in enumerate(track_ids)}, value=Track.id)
+    return query.filter(Track.id.in_(track_ids)).order_by(ordering)
+
+
+def apply_artist_filter(query: Query, artist: str) -> Query:
+    """Substring match on artist, backed by the trigram index on PostgreSQL"""
+    return query.filter(Track.artist.ilike(f"%{escape_like(artist)}%", escape="\\"))
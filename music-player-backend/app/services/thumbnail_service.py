@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process pool for image work, created on first use"""
+    global _pool
+    if _pool is None:
+        # spawn: forking a worker that already runs threads is unsafe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def make_thumbnails(source_path: str, target_dir: str, stem: str, sizes: List[int]) -> Dict[str, str]:
+    """
+    Render square WebP variants of a cover image.
+    Runs inside the process pool, so it only touches the filesystem.
+    :param source_path: original cover
+    :param target_dir: directory for the variants
+    :param stem: file name prefix for the variants
+    :param sizes: edge lengths in pixels
+    :return: size -> file name
+    """
+    from PIL import Image, ImageOps
+
+    os.makedirs(target_dir, exist_ok=True)
+    variants = {}
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        for size in sizes:
+            thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+            filename = f"{stem}_{size}.webp"
+            # Unique temp name: identical covers share a stem, and two
+            # uploads of one cover may render its variants at the same time
+            fd, temp_path = tempfile.mkstemp(dir=target_dir, prefix=f".{filename}.", suffix=".part")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    thumbnail.save(file, "WEBP", quality=80, method=4)
+                os.replace(temp_path, os.path.join(target_dir, filename))
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            variants[str(size)] = filename
+    return variants
+
+
+async def build_thumbnails(cover_relative_path: str) -> Optional[Dict[str, str]]:
+    """
+    Generate thumbnails for a stored cover in the process pool
+    :param cover_relative_path: cover path relative to MEDIA_ROOT
+    :return: size -> media URL, None if the image couldn't be processed
+    """
+    source_path = os.path.join(settings.MEDIA_ROOT, cover_relative_path)
+    relative_dir = os.path.join(settings.COVERS_DIR, settings.THUMBNAILS_DIR)
+    stem = os.path.splitext(os.path.basename(cover_relative_path))[0]
+    target_dir = os.path.join(settings.MEDIA_ROOT, relative_dir)
+
+    # Covers are content-addressed, a reused cover already has its variants
+    existing = {str(size): f"{stem}_{size}.webp" for size in settings.THUMBNAIL_SIZES}
+    if all(os.path.exists(os.path.join(target_dir, name)) for name in existing.values()):
+        return {size: f"/media/{relative_dir}/{name}" for size, name in existing.items()}
+
+    loop = asyncio.get_running_loop()
+    try:
+        variants = await loop.run_in_executor(
+            get_pool(),
+            make_thumbnails,
+            source_path,
+            target_dir,
+            stem,
+            settings.THUMBNAIL_SIZES,
+        )
+    except Exception:
+        logger.exception("Thumbnail generation failed for %s", cover_relative_path)
+        return None
+
+    return {
+        size: f"/media/{relative_dir}/{filename}"
+        for size, filename in variants.items()
+    }
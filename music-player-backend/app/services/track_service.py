@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.db.session import SessionLocal
+
+from app.core.auth import Principal
+from app.core.response_cache import response_cache
+from app.db.models.track import Track, Genre
+from app.db.models.favorite import Favorite
+from app.db.models.dislike import Dislike
+from app.schemas.track import TrackWithStats
+from app.services.audio_probe import AudioInfo
+
+
+# Response cache namespaces: plain track lists, lists with include=stats,
+# one per track for GET /tracks/{id}, and tracks per genre
+TRACK_LISTS_CACHE = "tracks"
+TRACK_STATS_CACHE = "tracks:stats"
+GENRE_COUNTS_CACHE = "genres:counts"
+
+
+def track_cache_namespace(track_id: int) -> str:
+    return f"track:{track_id}"
+
+
+def invalidate_track_cache(track_id: Optional[int] = None, catalog: bool = False) -> None:
+    """
+    Drop cached track responses after a commit
+    :param track_id: track whose counters or fields changed
+    :param catalog: the track itself changed or was added, not only its
+        favorites/dislikes/reviews counters, so plain lists and genre
+        counts are stale too
+    """
+    namespaces = [TRACK_STATS_CACHE]
+    if catalog:
+        namespaces.extend((TRACK_LISTS_CACHE, GENRE_COUNTS_CACHE))
+    if track_id is not None:
+        namespaces.append(track_cache_namespace(track_id))
+    response_cache.invalidate(*namespaces)
+
+
+def attach_track_stats(
+    db: Session, tracks: List[Track], current_user: Optional[Principal] = None
+) -> List[TrackWithStats]:
+    """
+    Build TrackWithStats for a page of tracks.
+    Counts come from the denormalized columns on tracks, per-user flags from
+    one IN query per table, so the cost doesn't depend on the page size.
+    :param db: database session
+    :param tracks: tracks of the current page
+    :param current_user: user to compute is_favorited/is_disliked for
+    :return: tracks with stats, in the same order
+    """
+    favorited = set()
+    disliked = set()
+    track_ids = [track.id for track in tracks]
+    if current_user and track_ids:
+        favorited = {
+            track_id for (track_id,) in db.query(Favorite.track_id).filter(
+                Favorite.user_id == current_user.id,
+                Favorite.track_id.in_(track_ids)
+            )
+        }
+        disliked = {
+            track_id for (track_id,) in db.query(Dislike.track_id).filter(
+                Dislike.user_id == current_user.id,
+                Dislike.track_id.in_(track_ids)
+            )
+        }
+
+    result = []
+    for track in tracks:
+        item = TrackWithStats.model_validate(track, from_attributes=True)
+        if current_user:
+            item.is_favorited = track.id in favorited
+            item.is_disliked = track.id in disliked
+        result.append(item)
+    return result
+
+
+def insert_track(
+    db: Session,
+    *,
+    title: str,
+    artist: str,
+    genre: Genre,
+    duration: float,
+    cover_path: str,
+    audio_path: str,
+    file_size: Optional[int] = None,
+    audio_info: Optional[AudioInfo] = None,
+) -> Track:
+    """
+    Insert a track whose media files are already stored
+    :param db: database session
+    :param file_size: size of the stored audio file, known even when the probe fails
+    :param audio_info: probed audio parameters, if the probe succeeded
+    :return: created track
+    """
+    track = Track(
+        title=title,
+        artist=artist,
+        genre=genre,
+        duration=duration,
+        cover_path=cover_path,
+        audio_path=audio_path,
+        file_size=file_size
+    )
+    if audio_info:
+        track.codec = audio_info.codec
+        track.bitrate = audio_info.bitrate
+        track.sample_rate = audio_info.sample_rate
+        track.channels = audio_info.channels
+        track.file_size = audio_info.file_size
+
+    db.add(track)
+    db.commit()
+    db.refresh(track)
+
+    return track
+
+
+def _save_cover_thumbnails(track_id: int, thumbnails: Dict[str, str]) -> None:
+    db = SessionLocal()
+    try:
+        db.query(Track).filter(Track.id == track_id).update(
+            {Track.cover_thumbnails: thumbnails}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    invalidate_track_cache(track_id, catalog=True)
+
+
+async def build_track_thumbnails(track_id: int, cover_relative_path: str) -> None:
+    """
+    Background task: render cover thumbnails and record them on the track
+    :param track_id: track id
+    :param cover_relative_path: cover path relative to MEDIA_ROOT
+    """
+    # The process pool machinery is only loaded once a cover is uploaded
+    from app.services.thumbnail_service import build_thumbnails
+
+    thumbnails = await build_thumbnails(cover_relative_path)
+    if thumbnails:
+        await run_in_threadpool(_save_cover_thumbnails, track_id, thumbnails)
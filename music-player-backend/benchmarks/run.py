@@ -0,0 +1,345 @@
+"""
+Benchmark the API hot paths in-process.
+
+    python -m benchmarks.run --tracks 20000 --users 2000             # quick run
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json     # compare
+
+Requests go through an ASGI client straight into the app, so the numbers
+cover routing, auth, serialization and the database, not the network.
+The database is seeded once per catalog size (see benchmarks.seed) and
+reused by later runs; --reseed starts over. Rows the write scenarios add
+are deleted after each run, so every run measures the same catalog.
+Point --database-url at a local PostgreSQL to measure the production
+setup.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(BENCHMARKS_DIR, 'bench.db')}"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=os.getenv("BENCHMARK_DATABASE_URL", DEFAULT_DATABASE_URL))
+    parser.add_argument("--tracks", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--playlists", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42, help="random seed for data and request mix")
+    parser.add_argument("--reseed", action="store_true", help="recreate the catalog even if it exists")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", help="comma-separated subset of scenarios to run")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with a saved baseline")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2,
+        help="allowed p95 slowdown against the baseline before failing (0.2 = 20%%)",
+    )
+    return parser.parse_args(argv)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], statements: List[int], errors: int, elapsed: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "db_statements_p50": sorted(statements)[len(statements) // 2] if statements else None,
+    }
+
+
+class Scenario:
+    """
+    One hot path: how to build a request and which status codes are fine.
+    Scenarios that write also say how to undo each request, so the
+    catalog is the same for the next run.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        build: Callable[[random.Random], Dict[str, Any]],
+        ok=(200,),
+        undo: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> None:
+        self.name = name
+        self.build = build
+        self.ok = ok
+        self.undo = undo
+
+
+def fresh_favorite_pairs(
+    engine, user_ids: List[int], pick_track: Callable[[random.Random], int], count: int, rng: random.Random
+) -> List[Tuple[int, int]]:
+    """
+    (user, track) pairs that are neither favorites nor dislikes yet, all
+    different: every favorite_add request then inserts a row, and no two
+    race for the same row of the unique constraint
+    """
+    from sqlalchemy import select, union_all
+
+    from app.db.models import Dislike, Favorite
+
+    with engine.connect() as connection:
+        taken = set(connection.execute(union_all(
+            select(Favorite.user_id, Favorite.track_id).where(Favorite.user_id.in_(user_ids)),
+            select(Dislike.user_id, Dislike.track_id).where(Dislike.user_id.in_(user_ids)),
+        )).all())
+
+    pairs: List[Tuple[int, int]] = []
+    for _ in range(count * 100):
+        if len(pairs) == count:
+            return pairs
+        pair = (rng.choice(user_ids), pick_track(rng))
+        if pair not in taken:
+            taken.add(pair)
+            pairs.append(pair)
+    raise SystemExit(f"catalog too small for {count} new favorites, use more --tracks or fewer --requests")
+
+
+def build_scenarios(
+    config,
+    tokens: Dict[int, str],
+    pick_track: Callable[[random.Random], int],
+    favorite_pairs: Iterator[Tuple[int, int]],
+) -> List[Scenario]:
+    from benchmarks.seed import PASSWORD, WORDS
+    from app.db.models.track import Genre
+
+    api = "/api/v1"
+    genres = [genre.value for genre in Genre]
+    user_ids = list(tokens)
+
+    def auth(rng: random.Random, user_id: Optional[int] = None) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {tokens[user_id if user_id is not None else rng.choice(user_ids)]}"}
+
+    def favorite(rng: random.Random) -> Dict[str, Any]:
+        user_id, track_id = next(favorite_pairs)
+        return {"method": "POST", "url": f"{api}/favorites/{track_id}", "headers": auth(rng, user_id)}
+
+    return [
+        Scenario("tracks_list_anonymous", lambda rng: {
+            "method": "GET", "url": f"{api}/tracks/", "params": {"page": rng.randint(1, 5)},
+        }),
+        Scenario("tracks_search", lambda rng: {
+            "method": "GET", "url": f"{api}/tracks/", "headers": auth(rng),
+            "params": {"search": rng.choice(WORDS), "count": "estimate"},
+        }),
+        Scenario("tracks_genre", lambda rng: {
+            "method": "GET", "url": f"{api}/tracks/", "headers": auth(rng),
+            "params": {"genre": rng.choice(genres), "include": "stats", "count": "estimate"},
+        }),
+        Scenario("track_detail", lambda rng: {
+            "method": "GET", "url": f"{api}/tracks/{pick_track(rng)}", "headers": auth(rng),
+        }),
+        Scenario("track_detail_anonymous", lambda rng: {
+            "method": "GET", "url": f"{api}/tracks/{pick_track(rng)}",
+        }),
+        Scenario("playlist_detail", lambda rng: {
+            "method": "GET", "url": f"{api}/playlists/{rng.randint(1, config.playlists)}", "headers": auth(rng),
+        }),
+        Scenario(
+            "favorite_add", favorite,
+            undo=lambda request: {**request, "method": "DELETE"},
+        ),
+        # 503 is the password pool shedding load, counted as an error
+        Scenario("login", lambda rng: {
+            "method": "POST", "url": f"{api}/auth/login",
+            "data": {"username": f"user{rng.randint(1, config.users)}", "password": PASSWORD},
+        }),
+    ]
+
+
+async def run_scenario(client, scenario: Scenario, args, rng: random.Random) -> Dict[str, Any]:
+    requests = [scenario.build(rng) for _ in range(args.warmup + args.requests)]
+    latencies: List[float] = []
+    statements: List[int] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for index, request in enumerate(requests):
+        queue.put_nowait((index >= args.warmup, request))
+
+    window: List[float] = []
+
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            try:
+                measured, request = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            response = await client.request(**request)
+            finished = time.perf_counter()
+            if not measured:
+                continue
+            window.extend((started, finished))
+            if response.status_code not in scenario.ok:
+                errors += 1
+            latencies.append(finished - started)
+            if "x-db-statements" in response.headers:
+                statements.append(int(response.headers["x-db-statements"]))
+
+    # Warmup requests are queued first, throughput counts from the first
+    # measured request to the last
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = max(window) - min(window) if window else 0.0
+
+    if scenario.undo is not None:
+        for request in requests:
+            await client.request(**scenario.undo(request))
+    return summarize(latencies, statements, errors, elapsed)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=BENCHMARKS_DIR,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Print current vs baseline p95 per scenario
+    :return: scenarios slower than baseline * (1 + tolerance)
+    """
+    regressions = []
+    print(f"\n{'scenario':<24}{'baseline p95':>14}{'p95':>10}{'change':>10}")
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or not previous["p95_ms"]:
+            print(f"{name:<24}{'-':>14}{current['p95_ms']:>10.2f}{'new':>10}")
+            continue
+        change = current["p95_ms"] / previous["p95_ms"] - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<24}{previous['p95_ms']:>14.2f}{current['p95_ms']:>10.2f}{change:>+10.1%}{flag}")
+    return regressions
+
+
+async def benchmark(args) -> Dict[str, Any]:
+    import httpx
+
+    from benchmarks.seed import SeedConfig, is_seeded, popularity_picker, seed
+    from app.config import settings
+    from app.core.security import create_access_token
+    from app.db.models.user import UserRole
+    from app.db.session import engine
+    from app.main import app
+
+    config = SeedConfig(tracks=args.tracks, users=args.users, playlists=args.playlists, seed=args.seed)
+    if args.reseed or not is_seeded(engine, config):
+        started = time.perf_counter()
+        seed(engine, config, log=lambda message: print(f"seeding {message}", file=sys.stderr))
+        print(f"seeded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    rng = random.Random(args.seed)
+    # Access tokens are minted directly, logging every user in would
+    # benchmark bcrypt instead of the endpoints
+    tokens = {
+        user_id: create_access_token(user_id, role=UserRole.USER, is_active=True)
+        for user_id in rng.sample(range(1, config.users + 1), min(100, config.users))
+    }
+    pick = popularity_picker(config.tracks, config.skew, rng)
+    pick_track = lambda r: pick(1, r)[0]
+    favorite_pairs = fresh_favorite_pairs(
+        engine, list(tokens), pick_track, args.warmup + args.requests, random.Random(f"{args.seed}:favorites"),
+    )
+    scenarios = build_scenarios(config, tokens, pick_track, iter(favorite_pairs))
+    if args.scenarios:
+        wanted = set(args.scenarios.split(","))
+        scenarios = [scenario for scenario in scenarios if scenario.name in wanted]
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "revision": git_revision(),
+            "database": engine.dialect.name,
+            "db_async": settings.DB_ASYNC,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "catalog": config.as_dict(),
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+        },
+        "scenarios": {},
+    }
+
+    # App exceptions come back as 500s and count as errors instead of
+    # ending the run
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for scenario in scenarios:
+                summary = await run_scenario(client, scenario, args, random.Random(f"{args.seed}:{scenario.name}"))
+                results["scenarios"][scenario.name] = summary
+                print(
+                    f"{scenario.name:<24} p50 {summary['p50_ms']:>8.2f}ms  p95 {summary['p95_ms']:>8.2f}ms  "
+                    f"p99 {summary['p99_ms']:>8.2f}ms  {summary['throughput_rps']:>8.1f} req/s  "
+                    f"sql {summary['db_statements_p50']}  errors {summary['errors']}"
+                )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    # The app reads its settings at import
+    os.environ["DATABASE_URL"] = args.database_url
+    # X-DB-Statements headers, for the statements-per-request column
+    os.environ.setdefault("DEBUG", "1")
+    os.environ.setdefault("DB_REVISION_CHECK", "off")
+    sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+
+    results = asyncio.run(benchmark(args))
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get("meta", {}).get("catalog") != results["meta"]["catalog"]:
+            print("warning: baseline was recorded with a different catalog", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\np95 regressed more than {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
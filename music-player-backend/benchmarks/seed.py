@@ -0,0 +1,240 @@
+"""
+Synthetic catalog for the benchmarks.
+
+Import after DATABASE_URL is set (benchmarks.run does it), the app binds
+its engine at import. Rows are written with Core executemany in chunks;
+the counters that mapper events normally maintain (track counters,
+genre_stats, media_blobs) are computed here instead.
+"""
+import random
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Engine
+
+from app.core.security import pwd_context
+from app.db.base import Base
+from app.db.migrations import alembic_config, schema_revisions
+from app.db.models import Dislike, Favorite, GenreStat, MediaBlob, Playlist, PlaylistTrack, Review, Track, User
+from app.db.models.playlist import POSITION_GAP
+from app.db.models.track import Genre
+from app.db.models.user import UserRole
+
+CHUNK = 10000
+PASSWORD = "benchmark-password"
+COVER_PATH = "/media/covers/benchmark.jpg"
+AUDIO_PATH = "/media/tracks/benchmark.mp3"
+
+# Titles are built from these so searches have realistic hit counts
+WORDS = [
+    "moon", "night", "drive", "blue", "summer", "rain", "city", "light", "dream", "fire",
+    "heart", "river", "ocean", "shadow", "golden", "echo", "wild", "silent", "neon", "storm",
+    "velvet", "paper", "glass", "midnight", "sun", "winter", "road", "sky", "star", "home",
+    "lost", "island", "dust", "sugar", "ghost", "wave", "forest", "mirror", "honey", "electric",
+]
+
+
+@dataclass
+class SeedConfig:
+    tracks: int = 1_000_000
+    users: int = 100_000
+    favorites_per_user: int = 10
+    dislikes_per_user: int = 2
+    reviews_per_user: int = 1
+    playlists: int = 10_000
+    playlist_size: int = 50
+    # Zipf exponent of track popularity, higher is more skewed
+    skew: float = 1.1
+    seed: int = 42
+
+    def as_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _chunks(rows: Iterable[Dict], size: int = CHUNK) -> Iterator[List[Dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(engine: Engine, table, rows: Iterable[Dict]) -> None:
+    for chunk in _chunks(rows):
+        with engine.begin() as connection:
+            connection.execute(insert(table), chunk)
+
+
+def popularity_picker(count: int, skew: float, rng: random.Random) -> Callable[..., List[int]]:
+    """
+    Sampler of 1-based ids where id 1 is the most popular, weights 1/rank^skew
+    :return: function taking k, and optionally the Random to draw from
+        instead of rng, returning k ids (with repeats)
+    """
+    cumulative = []
+    total = 0.0
+    for rank in range(1, count + 1):
+        total += 1.0 / rank ** skew
+        cumulative.append(total)
+    population = range(1, count + 1)
+
+    def pick(k: int, draw: random.Random = rng) -> List[int]:
+        return draw.choices(population, cum_weights=cumulative, k=k)
+
+    return pick
+
+
+def _pairs(users: int, per_user: int, pick: Callable[[int], List[int]], taken: Dict[int, set]) -> List[tuple]:
+    pairs = []
+    for user_id in range(1, users + 1):
+        seen = taken.setdefault(user_id, set())
+        for track_id in pick(per_user):
+            if track_id not in seen:
+                seen.add(track_id)
+                pairs.append((user_id, track_id))
+    return pairs
+
+
+def is_seeded(engine: Engine, config: SeedConfig) -> bool:
+    """
+    True if the database already holds a catalog of this size, on
+    PostgreSQL also migrated to the current head
+    """
+    try:
+        with engine.connect() as connection:
+            tracks = connection.execute(select(func.count()).select_from(Track.__table__)).scalar()
+            users = connection.execute(select(func.count()).select_from(User.__table__)).scalar()
+        if engine.dialect.name == "postgresql":
+            current, heads = schema_revisions(engine)
+            if current != heads:
+                return False
+    except Exception:
+        return False
+    return tracks == config.tracks and users == config.users
+
+
+def create_schema(engine: Engine) -> None:
+    """
+    Drop every table and build an empty schema the way production has it.
+    PostgreSQL runs `alembic upgrade head`, so pg_trgm and the indexes the
+    migrations create (GIN search indexes, list indexes) are in place.
+    The migrations are PostgreSQL-only, SQLite gets the tables and indexes
+    the models declare.
+    """
+    Base.metadata.drop_all(bind=engine)
+    if engine.dialect.name != "postgresql":
+        Base.metadata.create_all(bind=engine)
+        return
+
+    from alembic import command
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    command.upgrade(alembic_config(), "head")
+
+
+def seed(engine: Engine, config: SeedConfig, log: Callable[[str], None] = print) -> None:
+    """
+    Recreate the schema, then fill it
+    :param engine: engine of the benchmark database
+    :param config: catalog size and shape
+    :param log: progress output
+    """
+    rng = random.Random(config.seed)
+    create_schema(engine)
+
+    pick = popularity_picker(config.tracks, config.skew, rng)
+    taken: Dict[int, set] = {}
+    favorites = _pairs(config.users, config.favorites_per_user, pick, taken)
+    dislikes = _pairs(config.users, config.dislikes_per_user, pick, taken)
+    reviews = _pairs(config.users, config.reviews_per_user, pick, {})
+    favorite_counts = Counter(track_id for _, track_id in favorites)
+    dislike_counts = Counter(track_id for _, track_id in dislikes)
+    review_counts = Counter(track_id for _, track_id in reviews)
+
+    genres = list(Genre)
+    genre_of = [rng.choice(genres) for _ in range(config.tracks)]
+
+    log(f"users: {config.users}")
+    # One hash for everybody, bcrypt per user would take hours
+    hashed_password = pwd_context.hash(PASSWORD)
+    _insert(engine, User.__table__, (
+        {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "hashed_password": hashed_password,
+            "is_active": True,
+            "role": UserRole.USER,
+        }
+        for user_id in range(1, config.users + 1)
+    ))
+
+    log(f"tracks: {config.tracks}")
+    _insert(engine, Track.__table__, (
+        {
+            "id": track_id,
+            "title": " ".join(rng.sample(WORDS, rng.randint(1, 3))),
+            "artist": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}",
+            "genre": genre_of[track_id - 1],
+            "duration": rng.uniform(90, 420),
+            "cover_path": COVER_PATH,
+            "audio_path": AUDIO_PATH,
+            "codec": "mp3",
+            "bitrate": 320,
+            "sample_rate": 44100,
+            "channels": 2,
+            "file_size": 8_000_000,
+            "favorites_count": favorite_counts[track_id],
+            "dislikes_count": dislike_counts[track_id],
+            "reviews_count": review_counts[track_id],
+        }
+        for track_id in range(1, config.tracks + 1)
+    ))
+    _insert(engine, GenreStat.__table__, (
+        {"genre": genre, "tracks_count": count} for genre, count in Counter(genre_of).items()
+    ))
+    _insert(engine, MediaBlob.__table__, (
+        {"path": url[len("/media/"):], "ref_count": config.tracks} for url in (COVER_PATH, AUDIO_PATH)
+    ))
+
+    log(f"favorites: {len(favorites)}, dislikes: {len(dislikes)}, reviews: {len(reviews)}")
+    _insert(engine, Favorite.__table__, ({"user_id": u, "track_id": t} for u, t in favorites))
+    _insert(engine, Dislike.__table__, ({"user_id": u, "track_id": t} for u, t in dislikes))
+    _insert(engine, Review.__table__, (
+        {"user_id": u, "track_id": t, "text": " ".join(rng.choices(WORDS, k=12))} for u, t in reviews
+    ))
+
+    log(f"playlists: {config.playlists} x {config.playlist_size} tracks")
+    _insert(engine, Playlist.__table__, (
+        {
+            "id": playlist_id,
+            "name": f"{rng.choice(WORDS).title()} mix {playlist_id}",
+            "is_public": True,
+            "user_id": rng.randint(1, config.users),
+        }
+        for playlist_id in range(1, config.playlists + 1)
+    ))
+    _insert(engine, PlaylistTrack.__table__, (
+        {"playlist_id": playlist_id, "track_id": track_id, "position": index * POSITION_GAP}
+        for playlist_id in range(1, config.playlists + 1)
+        for index, track_id in enumerate(
+            rng.sample(range(1, config.tracks + 1), min(config.playlist_size, config.tracks)), start=1
+        )
+    ))
+
+    if engine.dialect.name == "postgresql":
+        # Ids were given explicitly, move the sequences past them
+        with engine.begin() as connection:
+            for table in ("users", "tracks", "playlists"):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM {table}))"
+                ))
+            # Planner statistics now, not whenever autovacuum gets to it
+            connection.execute(text("ANALYZE"))
@@ -0,0 +1,107 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+# Same as alembic/env.py: make `app` importable from the project root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# The app reads its settings at import. Tests run against a throwaway
+# SQLite file unless TEST_DATABASE_URL points somewhere else.
+_test_dir = tempfile.mkdtemp(prefix="tuneviewer-tests-")
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{os.path.join(_test_dir, 'test.db')}"
+)
+os.environ["MEDIA_ROOT"] = os.path.join(_test_dir, "media")
+os.environ["DB_REVISION_CHECK"] = "off"
+# X-DB-Statements and friends on every response
+os.environ["DEBUG"] = "1"
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """
+    The app's engine with the schema in place. PostgreSQL gets it from
+    `alembic upgrade head`, like production, so TEST_DATABASE_URL must be
+    a database the tests may wipe. The migrations are PostgreSQL-only
+    (pg_trgm, now()), SQLite gets the tables and indexes the models declare.
+    """
+    from app.db import models  # noqa: F401, registers every table
+    from app.db.base import Base
+    from app.db.session import engine
+
+    if engine.dialect.name == "postgresql":
+        from alembic import command
+
+        from app.db.migrations import alembic_config
+
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA public CASCADE"))
+            connection.execute(text("CREATE SCHEMA public"))
+        command.upgrade(alembic_config(), "head")
+    else:
+        Base.metadata.create_all(bind=engine)
+    return engine
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(engine):
+    """Factory inserting an active user, returns the user id"""
+    from app.db.models.user import User, UserRole
+    from app.db.session import SessionLocal
+
+    def make(role: UserRole = UserRole.USER) -> int:
+        name = f"user-{uuid.uuid4().hex[:12]}"
+        with SessionLocal() as db:
+            # Never logged in with, a real bcrypt hash would only slow tests down
+            user = User(username=name, email=f"{name}@example.com", hashed_password="!", role=role, is_active=True)
+            db.add(user)
+            db.commit()
+            return user.id
+
+    return make
+
+
+@pytest.fixture
+def make_track(engine):
+    """Factory inserting a track, returns the track id"""
+    from app.db.models.track import Genre, Track
+    from app.db.session import SessionLocal
+
+    def make(title: str = "Blue Moon", genre: Genre = Genre.POP) -> int:
+        with SessionLocal() as db:
+            track = Track(
+                title=title, artist="Test Artist", genre=genre, duration=180.0,
+                cover_path="/media/covers/test.jpg", audio_path="/media/tracks/test.mp3",
+            )
+            db.add(track)
+            db.commit()
+            return track.id
+
+    return make
+
+
+@pytest.fixture
+def auth_headers():
+    """Authorization header with an access token for a user id"""
+    from app.core.security import create_access_token
+    from app.db.models.user import UserRole
+
+    def headers(user_id: int, role: UserRole = UserRole.USER) -> dict:
+        token = create_access_token(user_id, role=role, is_active=True)
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
@@ -0,0 +1,52 @@
+import struct
+
+import pytest
+
+from app.db.models.user import UserRole
+from app.services.audio_probe import AudioProbeError, probe_audio
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def mvhd(timescale: int, duration: int) -> bytes:
+    # version/flags, creation and modification times, then timescale/duration
+    return box(b"mvhd", bytes(12) + struct.pack(">II", timescale, duration) + bytes(80))
+
+
+FTYP = box(b"ftyp", b"M4A \x00\x00\x00\x00M4A isom")
+
+
+def test_mp4_duration(tmp_path):
+    path = tmp_path / "song.m4a"
+    path.write_bytes(FTYP + box(b"moov", mvhd(1000, 90_500)))
+
+    info = probe_audio(str(path))
+    assert info.duration == 90.5
+    assert info.file_size == path.stat().st_size
+
+
+def test_deeply_nested_mp4_is_a_probe_error(tmp_path):
+    nested = mvhd(1000, 1000)
+    for _ in range(5000):
+        nested = box(b"moov", nested)
+    path = tmp_path / "nested.m4a"
+    path.write_bytes(FTYP + nested)
+
+    with pytest.raises(AudioProbeError):
+        probe_audio(str(path))
+
+
+def test_upload_keeps_file_size_when_probe_fails(client, make_user, auth_headers):
+    admin = make_user(UserRole.ADMIN)
+    audio = b"not really audio" * 64
+    response = client.post(
+        "/api/v1/tracks/",
+        headers=auth_headers(admin, UserRole.ADMIN),
+        data={"title": "Unreadable", "artist": "Probe", "genre": "Pop", "duration": "12"},
+        files={"cover": ("cover.jpg", b"cover", "image/jpeg"), "audio": ("song.mp3", audio, "audio/mpeg")},
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["file_size"] == len(audio)
+    assert response.json()["duration"] == 12
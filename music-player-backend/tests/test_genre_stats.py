@@ -0,0 +1,35 @@
+import threading
+
+from sqlalchemy import delete, select
+
+from app.db.models.genre_stat import GenreStat, bump_genre_count
+from app.db.models.track import Genre
+
+
+def test_concurrent_first_tracks_of_a_genre(engine):
+    genre = Genre.AMBIENT
+    with engine.begin() as connection:
+        connection.execute(delete(GenreStat.__table__).where(GenreStat.genre == genre))
+
+    errors = []
+
+    def second_writer():
+        try:
+            with engine.begin() as connection:
+                bump_genre_count(connection, genre, 1)
+        except Exception as e:
+            errors.append(e)
+
+    # The first writer creates the row but has not committed when the
+    # second one arrives, both saw no row for the genre
+    with engine.begin() as connection:
+        bump_genre_count(connection, genre, 1)
+        thread = threading.Thread(target=second_writer)
+        thread.start()
+        thread.join(timeout=0.5)
+    thread.join()
+
+    assert errors == []
+    with engine.connect() as connection:
+        count = connection.execute(select(GenreStat.tracks_count).where(GenreStat.genre == genre)).scalar()
+    assert count == 2
@@ -0,0 +1,45 @@
+"""
+List endpoints must send the same number of SQL statements whatever the
+page size: relationships come from the join, not one lazy load per item.
+"""
+import pytest
+
+from app.db.models import Dislike, Favorite, Review
+from app.db.session import SessionLocal
+
+ITEMS = 60
+
+
+@pytest.fixture
+def lists(make_user, make_track, auth_headers):
+    """
+    Favorites, dislikes and reviews lists with more than a page of items
+    each. Every review has its own author: with a single one the identity
+    map would answer the lazy loads and hide them.
+    """
+    fan = make_user()
+    critic = make_user()
+    reviewers = [make_user() for _ in range(ITEMS)]
+    track_ids = [make_track(title=f"track {index}") for index in range(ITEMS)]
+    with SessionLocal() as db:
+        db.add_all([Favorite(user_id=fan, track_id=track_id) for track_id in track_ids])
+        db.add_all([Dislike(user_id=critic, track_id=track_id) for track_id in track_ids])
+        db.add_all([Review(user_id=reviewer, track_id=track_ids[0], text="nice") for reviewer in reviewers])
+        db.commit()
+    return {
+        "favorites": ("/api/v1/favorites/", {}, auth_headers(fan)),
+        "dislikes": ("/api/v1/dislikes/", {}, auth_headers(critic)),
+        "reviews": ("/api/v1/reviews/", {"track_id": track_ids[0]}, {}),
+    }
+
+
+@pytest.mark.parametrize("name", ["favorites", "dislikes", "reviews"])
+def test_statements_do_not_grow_with_page_size(client, lists, name):
+    url, params, headers = lists[name]
+    statements = {}
+    for size in (5, 50):
+        response = client.get(url, params={**params, "size": size}, headers=headers)
+        assert response.status_code == 200, response.text
+        assert len(response.json()["items"]) == size
+        statements[size] = int(response.headers["x-db-statements"])
+    assert statements[5] == statements[50], statements
@@ -0,0 +1,78 @@
+import asyncio
+import io
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from starlette.datastructures import UploadFile
+
+from app.db.models.media_blob import MediaBlob, acquire_blob, release_blob
+from app.services.media_service import StoredFile, reclaim_blobs, release_stored_files, save_upload
+
+
+def ref_count(engine, path: str):
+    with engine.connect() as connection:
+        return connection.execute(select(MediaBlob.ref_count).where(MediaBlob.path == path)).scalar()
+
+
+def upload(engine, content: bytes) -> StoredFile:
+    with Session(engine) as db:
+        return asyncio.run(save_upload(db, UploadFile(io.BytesIO(content), filename="cover.jpg"), "covers", 1))
+
+
+def test_acquire_creates_then_counts(engine):
+    path = "covers/aa/acquire.jpg"
+    for _ in range(3):
+        with engine.begin() as connection:
+            acquire_blob(connection, path)
+    assert ref_count(engine, path) == 3
+
+    with engine.begin() as connection:
+        assert not release_blob(connection, path)
+        assert not release_blob(connection, path)
+        assert release_blob(connection, path)
+    assert ref_count(engine, path) == 0
+
+    reclaim_blobs(engine, [path])
+    assert ref_count(engine, path) is None
+
+
+def test_cleanup_keeps_files_another_track_references(engine):
+    referenced = upload(engine, b"referenced cover")
+    orphan = upload(engine, b"orphan cover")
+    with engine.begin() as connection:
+        # A track inserted with the same content
+        acquire_blob(connection, referenced.relative_path)
+
+    with Session(engine) as db:
+        release_stored_files(db, [referenced, orphan])
+
+    assert os.path.exists(referenced.full_path)
+    assert not os.path.exists(orphan.full_path)
+    assert ref_count(engine, referenced.relative_path) == 1
+    assert ref_count(engine, orphan.relative_path) is None
+
+
+def test_upload_during_delete_keeps_the_file(engine):
+    first = upload(engine, b"same cover")
+    with engine.begin() as connection:
+        # The last track using the blob is deleted, the file goes after commit
+        assert release_blob(connection, first.relative_path)
+
+    second = upload(engine, b"same cover")
+    reclaim_blobs(engine, [first.relative_path])
+
+    assert os.path.exists(second.full_path)
+    assert ref_count(engine, second.relative_path) == 1
+
+
+def test_upload_after_reclaim_writes_the_file_again(engine):
+    first = upload(engine, b"other cover")
+    with engine.begin() as connection:
+        assert release_blob(connection, first.relative_path)
+    reclaim_blobs(engine, [first.relative_path])
+    assert not os.path.exists(first.full_path)
+
+    second = upload(engine, b"other cover")
+    assert os.path.exists(second.full_path)
+    assert ref_count(engine, second.relative_path) == 1
@@ -0,0 +1,27 @@
+import pytest
+
+from app.core import pagination
+from app.core.pagination import estimate_count
+from app.db.models.track import Track
+from app.db.session import SessionLocal
+
+
+@pytest.fixture
+def postgres(engine):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("planner estimates are PostgreSQL-only")
+
+
+def test_planner_estimate_keeps_user_text_as_parameter(postgres, make_track):
+    make_track(title="moon :word")
+    with SessionLocal() as db:
+        query = db.query(Track).filter(Track.title.ilike("%:word%"))
+        assert pagination._planner_estimate(query) is not None
+
+
+def test_failed_estimate_falls_back_to_exact_count(postgres, make_track, monkeypatch):
+    make_track(title="fallback song")
+    monkeypatch.setattr(pagination, "_EXPLAIN_PREFIX", "EXPLAIN (NO SUCH OPTION) ")
+    with SessionLocal() as db:
+        query = db.query(Track).filter(Track.title == "fallback song")
+        assert estimate_count(query, "tracks-fallback-test") == 1
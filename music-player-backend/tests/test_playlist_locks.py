@@ -0,0 +1,71 @@
+"""
+Adding and moving tracks lock the playlist row like batch operations and
+the background rebalance do, so the neighbour keys place_track reads stay
+valid until the change commits.
+"""
+import threading
+
+import pytest
+from sqlalchemy import select, update
+
+from app.db.models import Playlist, PlaylistTrack
+from app.db.models.playlist import POSITION_GAP
+from app.db.session import SessionLocal
+
+API = "/api/v1"
+
+
+@pytest.mark.parametrize("change, expected", [
+    # "new" inserted at position 2
+    ("add", ["first", "new", "second", "third"]),
+    # "first" moved to position 2
+    ("move", ["second", "first", "third"]),
+])
+def test_track_changes_wait_for_a_rebalance(
+    engine, client, make_user, make_track, auth_headers, change, expected
+):
+    if engine.dialect.name != "postgresql":
+        pytest.skip("SQLite has no row locks")
+    user_id = make_user()
+    headers = auth_headers(user_id)
+    track_ids = {title: make_track(title=title) for title in ("first", "second", "third", "new")}
+    with SessionLocal() as db:
+        playlist = Playlist(name="locked", user_id=user_id, is_public=False)
+        db.add(playlist)
+        db.flush()
+        db.add_all([
+            PlaylistTrack(playlist_id=playlist.id, track_id=track_ids[title], position=index * POSITION_GAP)
+            for index, title in enumerate(("first", "second", "third"), start=1)
+        ])
+        db.commit()
+        playlist_id = playlist.id
+
+    if change == "add":
+        request = {
+            "method": "POST", "url": f"{API}/playlists/{playlist_id}/tracks",
+            "json": {"track_id": track_ids["new"], "position": 2},
+        }
+    else:
+        request = {
+            "method": "PUT", "url": f"{API}/playlists/{playlist_id}/tracks/{track_ids['first']}",
+            "json": {"position": 2},
+        }
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(client.request(headers=headers, **request)))
+
+    # A rebalance holding the playlist moves every key far up, in the same
+    # order. Keys read before it commits would place the track before all
+    with engine.begin() as connection:
+        connection.execute(select(Playlist.id).where(Playlist.id == playlist_id).with_for_update())
+        connection.execute(
+            update(PlaylistTrack)
+            .where(PlaylistTrack.playlist_id == playlist_id)
+            .values(position=PlaylistTrack.position * 100)
+        )
+        thread.start()
+        thread.join(timeout=0.5)
+    thread.join()
+
+    response = responses[0]
+    assert response.status_code == 200, response.text
+    assert [item["track"]["title"] for item in response.json()["tracks"]] == expected
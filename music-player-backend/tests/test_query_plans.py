@@ -0,0 +1,125 @@
+"""
+The hot list endpoints must be served from indexes.
+
+Every SELECT an endpoint sends is recorded and EXPLAINed with the same
+parameters. SQLite plans must not SCAN a table without an index;
+PostgreSQL plans must not contain a Seq Scan. PostgreSQL prefers a Seq
+Scan on tables this small whatever the indexes, so enable_seqscan is off
+while explaining: a Seq Scan then only remains where no index applies.
+Only the dialect of the configured database runs (TEST_DATABASE_URL for
+PostgreSQL), the other one is skipped.
+"""
+from contextlib import contextmanager
+from typing import List, Tuple
+
+import pytest
+from sqlalchemy import event
+
+from app.db.models import Dislike, Favorite, Playlist, PlaylistTrack, Review
+from app.db.models.playlist import POSITION_GAP
+from app.db.session import SessionLocal
+
+API = "/api/v1"
+
+HOT_REQUESTS = [
+    "tracks_by_genre",
+    "tracks_by_genre_cursor",
+    "tracks_search",
+    "favorites",
+    "dislikes",
+    "reviews_by_user",
+    "reviews_by_track",
+    "playlist_tracks",
+    "playlist_tracks_paged",
+]
+
+
+@contextmanager
+def recorded_selects(engine):
+    statements: List[Tuple[str, object]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def unindexed_access(connection, statement: str, parameters) -> List[str]:
+    """Plan lines reading a table without an index, empty if there are none"""
+    if connection.dialect.name == "sqlite":
+        details = [row[-1] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        assert any("USING" in detail and "INDEX" in detail for detail in details), details
+        # Subqueries are scanned by name, they are not tables
+        subqueries = {detail.split()[1] for detail in details if detail.startswith(("CO-ROUTINE", "MATERIALIZE"))}
+        return [
+            detail for detail in details
+            if detail.startswith("SCAN ") and " USING " not in detail and detail.split()[1] not in subqueries
+        ]
+
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    lines = [row[0] for row in connection.exec_driver_sql("EXPLAIN " + statement, parameters)]
+    return [line.strip() for line in lines if "Seq Scan" in line]
+
+
+@pytest.fixture
+def hot_requests(client, make_user, make_track, auth_headers):
+    """Request for every hot endpoint, against a small catalog"""
+    user_id = make_user()
+    headers = auth_headers(user_id)
+    track_ids = [make_track(title=f"moon song {index}") for index in range(3)]
+    with SessionLocal() as db:
+        db.add_all([
+            Favorite(user_id=user_id, track_id=track_ids[0]),
+            Dislike(user_id=user_id, track_id=track_ids[1]),
+            Review(user_id=user_id, track_id=track_ids[0], text="nice"),
+        ])
+        playlist = Playlist(name="mix", user_id=user_id, is_public=False)
+        db.add(playlist)
+        db.flush()
+        db.add_all([
+            PlaylistTrack(playlist_id=playlist.id, track_id=track_id, position=index * POSITION_GAP)
+            for index, track_id in enumerate(track_ids, start=1)
+        ])
+        db.commit()
+        playlist_id = playlist.id
+
+    first_page = client.get(f"{API}/tracks/", params={"genre": "Pop", "size": 1}, headers=headers)
+    cursor = first_page.json()["next_cursor"]
+    assert cursor
+
+    return {
+        "tracks_by_genre": (f"{API}/tracks/", {"genre": "Pop"}),
+        "tracks_by_genre_cursor": (f"{API}/tracks/", {"genre": "Pop", "size": 1, "cursor": cursor}),
+        "tracks_search": (f"{API}/tracks/", {"search": "moon"}),
+        "favorites": (f"{API}/favorites/", {}),
+        "dislikes": (f"{API}/dislikes/", {}),
+        "reviews_by_user": (f"{API}/reviews/", {"user_id": user_id}),
+        "reviews_by_track": (f"{API}/reviews/", {"track_id": track_ids[0]}),
+        "playlist_tracks": (f"{API}/playlists/{playlist_id}", {}),
+        "playlist_tracks_paged": (f"{API}/playlists/{playlist_id}", {"tracks_limit": 2}),
+    }, headers
+
+
+@pytest.mark.parametrize("name", HOT_REQUESTS)
+@pytest.mark.parametrize("dialect", ["sqlite", "postgresql"])
+def test_hot_queries_use_indexes(engine, client, hot_requests, dialect, name):
+    if engine.dialect.name != dialect:
+        pytest.skip(f"tests run on {engine.dialect.name}")
+    if dialect == "sqlite" and name == "tracks_search":
+        pytest.skip("SQLite has no search index, search goes through the in-memory fallback")
+
+    requests, headers = hot_requests
+    url, params = requests[name]
+    with recorded_selects(engine) as statements:
+        response = client.get(url, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    assert statements
+
+    for statement, parameters in statements:
+        with engine.connect() as connection:
+            assert unindexed_access(connection, statement, parameters) == [], statement
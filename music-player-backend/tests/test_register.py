@@ -0,0 +1,44 @@
+import uuid
+
+from app.api.endpoints import auth
+from app.db.models.user import User
+from app.db.session import SessionLocal
+
+API = "/api/v1"
+
+
+def registration(name: str) -> dict:
+    return {"username": name, "email": f"{name}@example.com", "password": "secret-password"}
+
+
+def test_duplicates_are_rejected_before_hashing(client, monkeypatch):
+    hashed = []
+
+    async def fake_hash(password: str) -> str:
+        hashed.append(password)
+        return "!"
+
+    monkeypatch.setattr(auth, "get_password_hash_async", fake_hash)
+    name = f"user-{uuid.uuid4().hex[:12]}"
+    assert client.post(f"{API}/auth/register", json=registration(name)).status_code == 200
+    assert len(hashed) == 1
+
+    duplicate = client.post(f"{API}/auth/register", json=registration(name))
+    assert duplicate.status_code == 400
+    assert duplicate.json()["detail"] == "Username already registered"
+    assert len(hashed) == 1
+
+
+def test_registration_racing_the_hash_is_rejected(client, monkeypatch):
+    name = f"user-{uuid.uuid4().hex[:12]}"
+
+    async def hash_while_someone_registers(password: str) -> str:
+        with SessionLocal() as db:
+            db.add(User(username=name, email=f"other-{name}@example.com", hashed_password="!", is_active=True))
+            db.commit()
+        return "!"
+
+    monkeypatch.setattr(auth, "get_password_hash_async", hash_while_someone_registers)
+    response = client.post(f"{API}/auth/register", json=registration(name))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username or email already registered"
@@ -0,0 +1,51 @@
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.middleware import RequestSizeLimitMiddleware
+
+LIMIT = 64 * 1024
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(RequestSizeLimitMiddleware, max_bytes=LIMIT)
+    return TestClient(app)
+
+
+def multipart_chunks(size: int, chunk_size: int = 8 * 1024):
+    """multipart/form-data body with one file field, as a generator so it is sent chunked"""
+    yield b'--boundary\r\nContent-Disposition: form-data; name="file"; filename="a.bin"\r\n'
+    yield b"Content-Type: application/octet-stream\r\n\r\n"
+    for offset in range(0, size, chunk_size):
+        yield b"x" * min(chunk_size, size - offset)
+    yield b"\r\n--boundary--\r\n"
+
+
+def post_chunked(client: TestClient, size: int):
+    return client.post(
+        "/upload",
+        content=multipart_chunks(size),
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"},
+    )
+
+
+def test_declared_content_length_over_limit():
+    response = make_client().post("/upload", files={"file": ("a.bin", b"x" * (LIMIT + 1))})
+    assert response.status_code == 413
+
+
+def test_chunked_upload_over_limit():
+    response = post_chunked(make_client(), LIMIT * 2)
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large"}
+
+
+def test_chunked_upload_within_limit():
+    response = post_chunked(make_client(), LIMIT // 2)
+    assert response.status_code == 200
+    assert response.json() == {"size": LIMIT // 2}
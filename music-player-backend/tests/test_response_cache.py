@@ -0,0 +1,32 @@
+import pytest
+
+from app.core.response_cache import ResponseCacheBackend
+from app.services.track_service import invalidate_track_cache
+
+
+def test_incomplete_backend_fails_at_construction():
+    class WithoutGenerations(ResponseCacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value):
+            pass
+
+    with pytest.raises(TypeError):
+        WithoutGenerations()
+
+
+def test_anonymous_track_list_revalidates_with_etag(client, make_track):
+    make_track()
+    first = client.get("/api/v1/tracks/")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    unchanged = client.get("/api/v1/tracks/", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    make_track()
+    invalidate_track_cache(catalog=True)
+    changed = client.get("/api/v1/tracks/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core.revocation import InMemoryRevocationStore, RevocationStore
+from app.core.security import create_refresh_token
+
+
+def test_incomplete_backend_fails_at_construction():
+    class TokensOnly(RevocationStore):
+        def revoke_token(self, jti, expires_at):
+            pass
+
+        def is_token_revoked(self, jti):
+            return False
+
+    with pytest.raises(TypeError):
+        TokensOnly()
+
+
+def test_revoke_if_active_has_one_winner():
+    store = InMemoryRevocationStore()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: store.revoke_if_active("jti", 2e9), range(64)))
+    assert results.count(True) == 1
+    assert store.is_token_revoked("jti")
+
+
+def test_refresh_rotates_the_token_once(client, make_user):
+    user_id = make_user()
+    refresh_token = create_refresh_token(user_id)
+
+    first = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert first.status_code == 200
+
+    # The old token again is a replay: rejected, and it ends the new session too
+    replay = client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+    assert replay.status_code == 401
+    rotated = client.post("/api/v1/auth/refresh", json={"refresh_token": first.json()["refresh_token"]})
+    assert rotated.status_code == 401
@@ -0,0 +1,57 @@
+"""
+Concurrent searches with DB_ASYNC: the fallback index is built from rows
+read on the event loop, so it must not hold its lock across those reads.
+"""
+import asyncio
+import threading
+
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.session import DatabaseRunner, async_database_url, get_db_runner
+from app.main import app
+from app.services.search_service import fallback_index
+
+API = "/api/v1"
+
+
+async def concurrent_searches(engine, count: int):
+    async_engine = create_async_engine(async_database_url(engine.url.render_as_string(hide_password=False)))
+    sessions = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def async_runner():
+        async with sessions() as async_session:
+            yield DatabaseRunner(async_session.sync_session, async_session)
+
+    app.dependency_overrides[get_db_runner] = async_runner
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(
+                client.get(f"{API}/tracks/", params={"search": "blue"}) for _ in range(count)
+            ))
+    finally:
+        app.dependency_overrides.pop(get_db_runner, None)
+        await async_engine.dispose()
+
+
+def test_concurrent_searches_with_async_sessions(engine, make_track):
+    if engine.dialect.name != "sqlite":
+        pytest.skip("the in-memory index is only used on SQLite")
+    make_track(title="Blue Monday")
+    fallback_index.invalidate()
+
+    # A deadlock blocks the event loop itself, so the loop runs in a thread
+    # the test can stop waiting for
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(responses=asyncio.run(concurrent_searches(engine, 4))), daemon=True
+    )
+    thread.start()
+    thread.join(timeout=30)
+    assert not thread.is_alive(), "concurrent searches hung"
+
+    responses = result["responses"]
+    assert [response.status_code for response in responses] == [200] * 4
+    assert all(response.json()["items"] for response in responses)
@@ -0,0 +1,29 @@
+import pytest
+
+from app.core.streaming import parse_range
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    ("bytes=0-99", 1000, (0, 99)),
+    ("bytes=900-", 1000, (900, 999)),
+    ("bytes=900-5000", 1000, (900, 999)),
+    ("bytes=-100", 1000, (900, 999)),
+    ("bytes=-5000", 1000, (0, 999)),
+    # Invalid range-specs are ignored, whatever the size
+    ("bytes=500-100", 1000, None),
+    ("bytes=2000-100", 1000, None),
+    ("bytes=abc", 1000, None),
+    ("bytes=0-1,5-9", 1000, None),
+    ("items=0-1", 1000, None),
+    # An empty file is sent whole
+    ("bytes=-100", 0, None),
+    ("bytes=0-", 0, None),
+])
+def test_parse_range(header, size, expected):
+    assert parse_range(header, size) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-2000", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
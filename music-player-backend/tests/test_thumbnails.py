@@ -0,0 +1,25 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from app.services.thumbnail_service import make_thumbnails
+
+
+def test_concurrent_renders_of_one_cover(tmp_path):
+    source = tmp_path / "cover.png"
+    Image.new("RGB", (800, 600), "red").save(source)
+    target = tmp_path / "thumbs"
+
+    # Identical covers share a stem, so their variants go to the same files
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [
+            pool.submit(make_thumbnails, str(source), str(target), "abc", [64, 256])
+            for _ in range(16)
+        ]
+        results = [future.result() for future in futures]
+
+    assert all(result == {"64": "abc_64.webp", "256": "abc_256.webp"} for result in results)
+    assert sorted(os.listdir(target)) == ["abc_256.webp", "abc_64.webp"]
+    with Image.open(target / "abc_256.webp") as image:
+        assert image.size == (256, 256)
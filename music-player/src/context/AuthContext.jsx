@@ -5,11 +5,79 @@ export const AuthContext = createContext();
 
 const API_URL = 'http://127.0.0.1:8000/api/v1';
 
+const saveTokens = ({ access_token, refresh_token }) => {
+  localStorage.setItem('token', access_token);
+  if (refresh_token) {
+    localStorage.setItem('refresh_token', refresh_token);
+  }
+};
+
+const clearTokens = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
+};
+
+// One refresh at a time: a refresh token is single-use, and the server ends
+// the whole session when one is presented twice
+let refreshPromise = null;
+
+const refreshTokens = () => {
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${API_URL}/auth/refresh`, { refresh_token: localStorage.getItem('refresh_token') })
+      .then((response) => {
+        saveTokens(response.data);
+        return response.data.access_token;
+      })
+      .finally(() => {
+        refreshPromise = null;
+      });
+  }
+  return refreshPromise;
+};
+
 export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState({ isAuthenticated: false, role: '' });
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
 
+  // Access tokens are short-lived: on 401 get a new pair with the refresh
+  // token and repeat the request once
+  useEffect(() => {
+    const interceptor = axios.interceptors.response.use(
+      (response) => response,
+      async (err) => {
+        const request = err.config;
+        if (
+          err.response?.status !== 401 ||
+          !request ||
+          request._retried ||
+          request.url.startsWith(`${API_URL}/auth/`) ||
+          !localStorage.getItem('refresh_token')
+        ) {
+          throw err;
+        }
+        request._retried = true;
+
+        let token = localStorage.getItem('token');
+        // Another tab may have refreshed already, then its token is stored
+        if (request.headers.Authorization === `Bearer ${token}`) {
+          try {
+            token = await refreshTokens();
+          } catch (refreshErr) {
+            console.error('Session expired:', refreshErr);
+            clearTokens();
+            setUser({ isAuthenticated: false, role: '' });
+            throw err;
+          }
+        }
+        request.headers.Authorization = `Bearer ${token}`;
+        return axios(request);
+      }
+    );
+    return () => axios.interceptors.response.eject(interceptor);
+  }, []);
+
   // Check if user is already logged in (token exists)
   useEffect(() => {
     const checkAuthStatus = async () => {
@@ -32,7 +100,7 @@ export const AuthProvider = ({ children }) => {
           });
         } catch (err) {
           console.error('Invalid token:', err);
-          localStorage.removeItem('token');
+          clearTokens();
           setUser({ isAuthenticated: false, role: '' });
         }
       }
@@ -58,8 +126,8 @@ export const AuthProvider = ({ children }) => {
       const response = await axios.post(`${API_URL}/auth/login`, formData);
       const { access_token } = response.data;
       
-      // Save token to localStorage
-      localStorage.setItem('token', access_token);
+      // Save tokens to localStorage
+      saveTokens(response.data);
       
       // Get user profile
       const userResponse = await axios.get(`${API_URL}/users/me`, {
@@ -111,7 +179,14 @@ export const AuthProvider = ({ children }) => {
 
   // Logout function
   const logout = () => {
-    localStorage.removeItem('token');
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      // Revoke the session on the server, the access token expires by itself
+      axios.post(`${API_URL}/auth/logout`, { refresh_token: refreshToken }).catch((err) => {
+        console.error('Logout failed:', err);
+      });
+    }
+    clearTokens();
     setUser({ isAuthenticated: false, role: '' });
   };
 
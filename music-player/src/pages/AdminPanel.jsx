@@ -172,22 +172,15 @@ const AdminPanel = () => {
       formData.append('cover', coverFile);
       formData.append('audio', audioFile);
 
-      const response = await fetch(`${API_URL}/tracks`, {
-        method: 'POST',
+      // Через axios, чтобы истёкший токен обновился и запрос повторился
+      const response = await axios.post(`${API_URL}/tracks`, formData, {
         headers: {
           'Authorization': `Bearer ${token}`
           // Не устанавливайте 'Content-Type' для multipart/form-data
-        },
-        body: formData
+        }
       });
 
-      if (!response.ok) {
-        const errorData = await response.json().catch(() => null);
-        throw new Error(errorData?.detail || `HTTP error! status: ${response.status}`);
-      }
-
-      const data = await response.json();
-      console.log('Upload response:', data);
+      console.log('Upload response:', response.data);
 
       // Сброс формы и обновление списка
       setNewTrack({ title: '', artist: '', genre: '', duration: 0 });
@@ -196,7 +189,7 @@ const AdminPanel = () => {
       fetchTracks();
     } catch (err) {
       console.error('Failed to add track. Full error:', err);
-      setError('Ошибка при добавлении трека: ' + err.message);
+      setError('Ошибка при добавлении трека: ' + (err.response?.data?.detail || err.message));
     } finally {
       setIsLoading(false);
     }